@@ -16,4 +16,6 @@ admin.site.register(Parent)
 admin.site.register(StudentEnrollment)
 admin.site.register(StudentFee)
 admin.site.register(StudentTermTotalFee)
-admin.site.register(Levy)
\ No newline at end of file
+admin.site.register(Levy)
+admin.site.register(Job)
+admin.site.register(StagedUpload)
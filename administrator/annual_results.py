@@ -0,0 +1,153 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .grading import get_grading_index
+from .models import AnnualResult, AnnualSubjectResult, ClassLevel, Result, StudentEnrollment, Term
+
+
+def rank_scores(scores, policy='competition'):
+    """
+    Positions for scores already sorted best first, with the same tie
+    rules as the term ranking: 'competition' gives 1, 2, 2, 4 and
+    'dense' gives 1, 2, 2, 3.
+    """
+    positions = []
+    previous = None
+    position = 0
+    for idx, score in enumerate(scores):
+        if score != previous:
+            position = position + 1 if policy == 'dense' else idx + 1
+            previous = score
+        positions.append(position)
+    return positions
+
+
+def _resolve_grade(index, score):
+    band = index.resolve(round(score))
+    return band if band else (None, None)
+
+
+def refresh_class_annual(class_level_id, session_id, policy=None):
+    """
+    Rebuild the cumulative results of one class for a session: each
+    student's subject totals across the session's terms come from a single
+    grouped Result query, and the students are ranked on their average.
+    """
+    class_level = ClassLevel.objects.filter(id=class_level_id).values('school_id', 'school__ranking_policy').first()
+    if class_level is None:
+        return []
+    if policy is None:
+        policy = class_level['school__ranking_policy'] or 'competition'
+
+    student_ids = set(
+        StudentEnrollment.objects.filter(class_level_id=class_level_id, session_id=session_id)
+        .values_list('student_id', flat=True)
+    )
+    student_ids.discard(None)
+
+    terms = list(Term.objects.filter(session_id=session_id).order_by('created_at', 'id').values_list('id', 'name'))
+    per_term = {
+        f'term_{term_id}': Sum('total_score', filter=Q(term_id=term_id))
+        for term_id, _ in terms
+    }
+    rows = (
+        Result.objects.filter(student_id__in=student_ids, session_id=session_id, term_id__in=[term_id for term_id, _ in terms])
+        .values('student_id', 'subjects')
+        .annotate(
+            total=Sum('total_score'),
+            terms_count=Count('term', filter=Q(total_score__isnull=False), distinct=True),
+            **per_term,
+        )
+        .order_by('student_id', 'subjects')
+    )
+
+    index = get_grading_index(class_level['school_id'])
+    subject_results = []
+    by_student = {}
+    for row in rows:
+        if not row['terms_count']:
+            continue
+        total = row['total'] or 0
+        average = round(total / row['terms_count'], 2)
+        grade, remark = _resolve_grade(index, average)
+        subject_results.append(AnnualSubjectResult(
+            student_id=row['student_id'],
+            session_id=session_id,
+            subjects=row['subjects'],
+            term_totals={
+                name: row[f'term_{term_id}']
+                for term_id, name in terms
+                if row[f'term_{term_id}'] is not None
+            },
+            total=total,
+            terms_count=row['terms_count'],
+            average=average,
+            grade=grade,
+            remark=remark,
+        ))
+        summary = by_student.setdefault(row['student_id'], {'total': 0, 'averages': [], 'terms_count': 0})
+        summary['total'] += total
+        summary['averages'].append(average)
+        summary['terms_count'] = max(summary['terms_count'], row['terms_count'])
+
+    averages = {
+        student_id: round(sum(summary['averages']) / len(summary['averages']), 2)
+        for student_id, summary in by_student.items()
+    }
+    ordered = sorted(averages, key=lambda student_id: averages[student_id], reverse=True)
+    positions = rank_scores([averages[student_id] for student_id in ordered], policy)
+    class_average = round(sum(averages.values()) / len(averages), 2) if averages else 0
+
+    annual_results = []
+    for student_id, position in zip(ordered, positions):
+        summary = by_student[student_id]
+        grade, remark = _resolve_grade(index, averages[student_id])
+        annual_results.append(AnnualResult(
+            student_id=student_id,
+            class_level_id=class_level_id,
+            session_id=session_id,
+            total=summary['total'],
+            average=averages[student_id],
+            subjects_count=len(summary['averages']),
+            terms_count=summary['terms_count'],
+            position=position,
+            class_average=class_average,
+            class_size=len(student_ids),
+            grade=grade,
+            remark=remark,
+        ))
+
+    with transaction.atomic():
+        AnnualSubjectResult.objects.filter(student_id__in=student_ids, session_id=session_id).delete()
+        AnnualResult.objects.filter(
+            Q(class_level_id=class_level_id) | Q(student_id__in=student_ids),
+            session_id=session_id,
+        ).delete()
+        AnnualSubjectResult.objects.bulk_create(subject_results)
+        AnnualResult.objects.bulk_create(annual_results)
+
+    return annual_results
+
+
+def get_student_annual(student_id, session_id):
+    """
+    Read a student's annual result and subject rows, building the class on
+    demand when it was never materialized (sessions from before the table).
+    Returns (annual_result, subject_results); annual_result is None when the
+    student has no results in the session.
+    """
+    annual = AnnualResult.objects.filter(student_id=student_id, session_id=session_id).select_related('class_level').first()
+    if annual is None:
+        class_level_id = (
+            StudentEnrollment.objects.filter(student_id=student_id, session_id=session_id, class_level__isnull=False)
+            .values_list('class_level_id', flat=True)
+            .first()
+        )
+        if class_level_id is None:
+            return None, []
+        refresh_class_annual(class_level_id, session_id)
+        annual = AnnualResult.objects.filter(student_id=student_id, session_id=session_id).select_related('class_level').first()
+        if annual is None:
+            return None, []
+
+    return annual, list(AnnualSubjectResult.objects.filter(student_id=student_id, session_id=session_id))
@@ -7,3 +7,4 @@ class AdministratorConfig(AppConfig):
     
     def ready(self):
         import administrator.signals
+        import administrator.tasks
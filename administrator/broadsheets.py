@@ -0,0 +1,123 @@
+import csv
+import tempfile
+
+import openpyxl
+import pandas as pd
+
+from .models import Result, StudentEnrollment
+
+
+class Echo:
+    """A file-like object that hands each written line back to the csv writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+class Broadsheet:
+    """
+    The students x subjects matrix of a class for one term. Scores come
+    from a single values_list() query over Result and are pivoted with
+    pandas, so no Result objects are built however large the class is.
+    """
+
+    def __init__(self, class_level, session, term, policy='competition'):
+        self.class_level = class_level
+        self.session = session
+        self.term = term
+        self.policy = policy
+        self.subjects, self.frame = self._build()
+
+    def _build(self):
+        students = pd.DataFrame.from_records(
+            StudentEnrollment.objects.filter(
+                class_level=self.class_level, session=self.session, student__isnull=False
+            ).values_list('student_id', 'student__name').distinct(),
+            columns=['student_id', 'student_name'],
+        ).drop_duplicates('student_id').set_index('student_id')
+
+        scores = pd.DataFrame.from_records(
+            Result.objects.filter(
+                student_id__in=students.index.tolist(), term=self.term, session=self.session
+            ).values_list('student_id', 'subjects', 'total_score'),
+            columns=['student_id', 'subject', 'total_score'],
+        )
+
+        matrix = scores.pivot_table(
+            index='student_id', columns='subject', values='total_score', aggfunc='sum'
+        ).reindex(students.index)
+        subjects = sorted(matrix.columns.tolist())
+        matrix = matrix[subjects]
+
+        frame = students.join(matrix)
+        frame['total'] = matrix.sum(axis=1, min_count=1)
+        frame['subjects_count'] = matrix.notna().sum(axis=1)
+        frame['average'] = (frame['total'] / frame['subjects_count'].where(frame['subjects_count'] > 0)).round(2)
+        # Same tie rules as the term ranking: 'min' is competition ranking
+        frame['position'] = frame['total'].rank(method='dense' if self.policy == 'dense' else 'min', ascending=False)
+        frame = frame.sort_values(['student_name']).reset_index()
+        return subjects, frame
+
+    @property
+    def headers(self):
+        return ['Student', *self.subjects, 'Total', 'Average', 'Position']
+
+    def rows(self):
+        """Each student's row as plain Python values, blank where there is no score."""
+        columns = ['student_name', *self.subjects, 'total', 'average', 'position']
+        for values in self.frame[columns].itertuples(index=False, name=None):
+            yield [None if pd.isna(value) else _to_python(value) for value in values]
+
+    def class_average(self):
+        averages = self.frame['average'].dropna()
+        return round(float(averages.mean()), 2) if not averages.empty else 0
+
+    def to_dict(self):
+        students = []
+        for student_id, row in zip(self.frame['student_id'], self.rows()):
+            name, scores, (total, average, position) = row[0], row[1:-3], row[-3:]
+            students.append({
+                "student_id": int(student_id),
+                "student_name": name,
+                "scores": dict(zip(self.subjects, scores)),
+                "total_score": total,
+                "average_score": average,
+                "position": position,
+            })
+        return {
+            "class": self.class_level.name,
+            "session": self.session.name,
+            "term": self.term.name,
+            "subjects": self.subjects,
+            "students": students,
+            "class_average": self.class_average(),
+            "out_of_students": len(students),
+        }
+
+    def to_xlsx(self):
+        """Write the broadsheet with openpyxl's write-only mode to a temporary file, rewound for streaming."""
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title="Broadsheet")
+        ws.append(self.headers)
+        for row in self.rows():
+            ws.append(row)
+
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+        output.seek(0)
+        return output
+
+    def iter_csv(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.headers)
+        for row in self.rows():
+            yield writer.writerow(['' if value is None else value for value in row])
+
+
+def _to_python(value):
+    # numpy scalars are not JSON serializable; whole numbers stay ints
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
@@ -0,0 +1,102 @@
+import tempfile
+
+import openpyxl
+
+from .models import Result, StudentEnrollment, Subject
+from .result_ingest import SCORE_FIELDS, clean_result_rows
+from .spreadsheets import SpreadsheetReader
+
+
+CLASS_TEMPLATE_HEADERS = ['Student ID', 'Student', 'Subject', 'CA1', 'CA2', 'CA3', 'Exam']
+
+
+def get_class_students(class_level, session):
+    """student_id -> name of everyone enrolled in the class for the session, ordered by name."""
+    students = {}
+    for student_id, name in (
+        StudentEnrollment.objects.filter(class_level=class_level, session=session, student__isnull=False)
+        .order_by('student__name')
+        .values_list('student_id', 'student__name')
+    ):
+        students.setdefault(student_id, name)
+    return students
+
+
+def write_class_template(school, class_level, session, term):
+    """
+    The class result template in long format: one row per student and
+    subject, pre-filled with the scores already saved for the term.
+    Written in write-only mode to a temporary file, rewound for streaming.
+    """
+    students = get_class_students(class_level, session)
+    subjects = list(Subject.objects.filter(school=school).order_by('name').values_list('name', flat=True))
+
+    saved = {}
+    for student_id, subject, ca1, ca2, ca3, exam in Result.objects.filter(
+        student_id__in=list(students), term=term, session=session, subjects__in=subjects
+    ).values_list('student_id', 'subjects', 'first_test', 'second_test', 'third_test', 'exam'):
+        saved[(student_id, subject)] = (ca1, ca2, ca3, exam)
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title="Results")
+    ws.append(CLASS_TEMPLATE_HEADERS)
+    for student_id, name in students.items():
+        for subject in subjects:
+            scores = saved.get((student_id, subject), (None, None, None, None))
+            ws.append([student_id, name, subject, *scores])
+
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def parse_class_workbook(file, students, subjects, progress=None):
+    """
+    Stream a filled class template and validate every row in memory. Rows
+    whose scores are all blank are template rows nobody filled in and are
+    ignored.
+
+    students maps the class's student_id -> name and subjects is the set
+    of the school's subject names. Returns (rows_by_student, errors, stats)
+    with rows_by_student ready for ingest_results().
+    """
+    raw_rows = {}
+    sheet_rows = {}
+    errors = []
+    with SpreadsheetReader(file, progress=progress) as sheet:
+        if sheet.headers[:len(CLASS_TEMPLATE_HEADERS)] != CLASS_TEMPLATE_HEADERS:
+            errors.append({'row': 1, 'reason': 'Invalid file format. Expected headers: ' + ', '.join(CLASS_TEMPLATE_HEADERS)})
+            return {}, errors, {}
+
+        for idx, row in sheet.rows():
+            student_id, _, subject = row[0], row[1], row[2]
+            scores = row[3:7]
+            if all(score is None or score == '' for score in scores):
+                continue
+
+            try:
+                student_id = int(student_id)
+            except (TypeError, ValueError):
+                student_id = None
+            if student_id not in students:
+                errors.append({'row': idx, 'reason': 'Student is not enrolled in this class'})
+                continue
+
+            subject = str(subject or '').strip().capitalize()
+            if subject not in subjects:
+                errors.append({'row': idx, 'reason': 'Invalid or missing subject name'})
+                continue
+
+            raw_rows.setdefault(student_id, []).append({'subject': subject, **dict(zip(SCORE_FIELDS, scores))})
+            sheet_rows.setdefault(student_id, []).append(idx)
+
+    rows_by_student = {}
+    for student_id, student_rows in raw_rows.items():
+        cleaned, row_errors = clean_result_rows(student_rows)
+        for error in row_errors:
+            errors.append({**error, 'row': sheet_rows[student_id][error['row']]})
+        rows_by_student[student_id] = cleaned
+
+    errors.sort(key=lambda error: error['row'])
+    return rows_by_student, errors, sheet.stats
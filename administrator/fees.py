@@ -0,0 +1,104 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Levy, StudentEnrollment, StudentFee, StudentTermTotalFee
+from .query_counter import QueryCounter
+
+
+BATCH_SIZE = 500
+TERM_TOTAL_LABEL = 'Total'
+
+
+def assign_levy(levy):
+    """
+    Charge levy to every student enrolled in its session: one bulk_create of
+    StudentFee rows for the students not yet charged, then a refresh of
+    their StudentTermTotalFee for the levy's term. Students already charged
+    this levy for the term are skipped, so running it again is harmless.
+    """
+    if not levy.school_id or not levy.session_id or not levy.term_id:
+        return None
+
+    with QueryCounter() as counter:
+        with transaction.atomic():
+            # Serialises overlapping runs for this levy, so the second sees the first's charges
+            Levy.objects.select_for_update().filter(id=levy.id).exists()
+            enrolled_ids = set(
+                StudentEnrollment.objects.filter(school_id=levy.school_id, session_id=levy.session_id, student__isnull=False)
+                .values_list('student_id', flat=True)
+            )
+            # StudentFee.save capitalizes the levy name, and Levy.save already did
+            charged_ids = set(
+                StudentFee.objects.filter(session_id=levy.session_id, term_id=levy.term_id, levy=levy.name, student_id__in=enrolled_ids)
+                .values_list('student_id', flat=True)
+            )
+            fees = [
+                StudentFee(student_id=student_id, term_id=levy.term_id, session_id=levy.session_id, levy=levy.name, amount=levy.amount)
+                for student_id in sorted(enrolled_ids - charged_ids)
+            ]
+            StudentFee.objects.bulk_create(fees, batch_size=BATCH_SIZE)
+
+            refresh_term_fee_totals(levy.session_id, levy.term_id, [fee.student_id for fee in fees])
+
+    return {
+        'charged': len(fees),
+        'already_charged': len(charged_ids),
+        'query_count': counter.count,
+        'elapsed_seconds': counter.elapsed,
+    }
+
+
+def refresh_term_fee_totals(session_id, term_id, student_ids):
+    """
+    Recompute StudentTermTotalFee for the students from their StudentFee
+    rows with one grouped sum. A changed total moves to_balance by the same
+    amount, so whatever was already paid stays paid.
+
+    Existing rows are updated with one UPDATE per distinct change rather
+    than one per student: a levy changes everyone's total by the same
+    amount, so that is usually a single statement.
+    """
+    if not student_ids:
+        return
+
+    totals = dict(
+        StudentFee.objects.filter(session_id=session_id, term_id=term_id, student_id__in=student_ids)
+        .order_by()
+        .values('student_id')
+        .annotate(total=Sum('amount'))
+        .values_list('student_id', 'total')
+    )
+    rows = StudentTermTotalFee.objects.filter(session_id=session_id, term_id=term_id)
+    current = dict(rows.filter(student_id__in=student_ids).values_list('student_id', 'total_amount'))
+
+    changes = defaultdict(list)
+    for student_id, total_amount in current.items():
+        change = (totals.get(student_id) or Decimal('0.00')) - total_amount
+        if change:
+            changes[change].append(student_id)
+
+    for change, changed_ids in changes.items():
+        rows.filter(student_id__in=changed_ids).update(
+            total_amount=F('total_amount') + change,
+            to_balance=F('to_balance') + change,
+        )
+    if changes:
+        changed_ids = [student_id for changed_ids in changes.values() for student_id in changed_ids]
+        rows.filter(student_id__in=changed_ids, to_balance__lte=0).update(paid=True)
+        rows.filter(student_id__in=changed_ids, to_balance__gt=0).update(paid=False)
+
+    StudentTermTotalFee.objects.bulk_create([
+        StudentTermTotalFee(
+            student_id=student_id,
+            session_id=session_id,
+            term_id=term_id,
+            levy=TERM_TOTAL_LABEL,
+            total_amount=totals.get(student_id) or Decimal('0.00'),
+            to_balance=totals.get(student_id) or Decimal('0.00'),
+            paid=(totals.get(student_id) or 0) <= 0,
+        )
+        for student_id in sorted(set(student_ids) - set(current))
+    ], batch_size=BATCH_SIZE)
@@ -0,0 +1,80 @@
+import bisect
+import time
+
+from django.core.cache import cache
+
+from .models import GradingSystem
+
+
+GRADING_CACHE_TIMEOUT = 60 * 60 * 24
+
+# school_id -> GradingIndex, reused by this process while its version is current
+_local_indexes = {}
+
+
+def _version_key(school_id):
+    return f'grading_version_{school_id}'
+
+
+def _bands_key(school_id, version):
+    return f'grading_bands_{school_id}_{version}'
+
+
+class GradingIndex:
+    """
+    A school's grading bands sorted by min_score, so a score is resolved
+    with a bisect instead of a GradingSystem query.
+    """
+
+    def __init__(self, school_id, version, bands):
+        self.school_id = school_id
+        self.version = version
+        self.bands = sorted(bands)
+        self._min_scores = [band[0] for band in self.bands]
+
+    def resolve(self, score):
+        """
+        Return (grade, remark) for the score, or None when no band covers it.
+        Overlapping bands resolve to the highest min_score, as the old
+        ordered .first() query did.
+        """
+        idx = bisect.bisect_right(self._min_scores, score)
+        while idx > 0:
+            idx -= 1
+            min_score, max_score, grade, remark = self.bands[idx]
+            if score <= max_score:
+                return grade, remark
+        return None
+
+
+def get_grading_version(school_id):
+    version = cache.get(_version_key(school_id))
+    if version is None:
+        # A fresh version after eviction, so no process trusts an old copy
+        version = time.time_ns()
+        if not cache.add(_version_key(school_id), version, GRADING_CACHE_TIMEOUT):
+            version = cache.get(_version_key(school_id), version)
+    return version
+
+
+def get_grading_index(school_id):
+    version = get_grading_version(school_id)
+    index = _local_indexes.get(school_id)
+    if index is not None and index.version == version:
+        return index
+
+    bands = cache.get(_bands_key(school_id, version))
+    if bands is None:
+        bands = list(
+            GradingSystem.objects.filter(school_id=school_id).values_list('min_score', 'max_score', 'grade', 'remark')
+        )
+        cache.set(_bands_key(school_id, version), bands, GRADING_CACHE_TIMEOUT)
+
+    index = GradingIndex(school_id, version, bands)
+    _local_indexes[school_id] = index
+    return index
+
+
+def invalidate_grading_index(school_id):
+    cache.set(_version_key(school_id), time.time_ns(), GRADING_CACHE_TIMEOUT)
+    _local_indexes.pop(school_id, None)
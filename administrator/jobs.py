@@ -0,0 +1,142 @@
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+# job name -> function, filled by @job in administrator/tasks.py
+_registry = {}
+
+
+def job(name):
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(name, school_id=None, max_attempts=None, **payload):
+    """
+    Queue a job as part of the current transaction, so the worker only sees
+    it once the write that triggered it has committed, and never sees it if
+    that write rolls back.
+    """
+    queued = Job.objects.create(
+        name=name,
+        school_id=school_id,
+        payload=payload,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_RUN_EAGERLY:
+        transaction.on_commit(lambda: run_job(claim(queued.id)))
+    return queued
+
+
+def _claimable(now):
+    # Queued jobs that are due, and running jobs whose worker went quiet past its visibility timeout
+    return Q(status='queued', run_after__lte=now) | Q(status='running', locked_until__lt=now)
+
+
+def claim(job_id=None, worker=None):
+    """
+    Take the next due job (or the given one) for this worker. The claim is a
+    conditional UPDATE, so two workers can never run the same job at once.
+    Returns the job, or None when there is nothing to do.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(_claimable(now))
+    if job_id is not None:
+        candidates = candidates.filter(id=job_id)
+
+    for candidate_id in candidates.order_by('run_after', 'id').values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(_claimable(now), id=candidate_id).update(
+            status='running',
+            attempts=F('attempts') + 1,
+            locked_by=worker or worker_name(),
+            locked_until=now + timedelta(seconds=settings.JOBS_VISIBILITY_TIMEOUT),
+        )
+        if claimed:
+            return Job.objects.get(id=candidate_id)
+    return None
+
+
+def extend_claim(queued):
+    """
+    Push a running job's locked_until a full visibility timeout ahead.
+    Returns False once the job is no longer running under this claim.
+    """
+    return bool(
+        Job.objects.filter(id=queued.id, status='running', locked_by=queued.locked_by).update(
+            locked_until=timezone.now() + timedelta(seconds=settings.JOBS_VISIBILITY_TIMEOUT),
+        )
+    )
+
+
+def _heartbeat(queued, stop):
+    # Renews the claim while the job runs, so a job slower than the visibility
+    # timeout is not claimed and run a second time by another worker
+    try:
+        while not stop.wait(settings.JOBS_VISIBILITY_TIMEOUT / 3):
+            if not extend_claim(queued):
+                return
+    finally:
+        connections.close_all()
+
+
+def run_job(queued):
+    """Run a claimed job, retrying with exponential backoff until max_attempts."""
+    if queued is None:
+        return None
+
+    func = _registry.get(queued.name)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(queued, stop), name=f'job-heartbeat-{queued.id}', daemon=True)
+    heartbeat.start()
+    try:
+        if func is None:
+            raise LookupError(f'No job registered as {queued.name!r}.')
+        func(**queued.payload)
+    except Exception:
+        queued.last_error = traceback.format_exc()
+        if queued.attempts >= queued.max_attempts:
+            queued.status = 'failed'
+            queued.finished_at = timezone.now()
+        else:
+            queued.status = 'queued'
+            queued.run_after = timezone.now() + timedelta(seconds=settings.JOBS_RETRY_DELAY * 2 ** (queued.attempts - 1))
+    else:
+        queued.status = 'done'
+        queued.last_error = None
+        queued.finished_at = timezone.now()
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    queued.locked_by = None
+    queued.locked_until = None
+    queued.save(update_fields=['status', 'run_after', 'last_error', 'finished_at', 'locked_by', 'locked_until'])
+    return queued
+
+
+def run_pending(limit=None, worker=None):
+    """Run due jobs until the queue is empty or limit jobs ran. Returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        queued = claim(worker=worker)
+        if queued is None:
+            break
+        run_job(queued)
+        ran += 1
+    return ran
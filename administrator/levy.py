@@ -1,3 +1,4 @@
+from decimal import Decimal, InvalidOperation
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
@@ -5,7 +6,7 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 
-from administrator.models import Levy, SchoolProfile
+from administrator.models import AcademicSession, Levy, SchoolProfile, Term
 from administrator.serializers import LeviesSerializer
 from django.shortcuts import get_object_or_404, render
 
@@ -25,8 +26,7 @@ class LeviesListAPIView(APIView):
     def get(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         levies = Levy.objects.filter(school=school)
         serializer = LeviesSerializer(levies, many=True)
         return Response(serializer.data)
@@ -35,19 +35,35 @@ class LeviesListAPIView(APIView):
     def post(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         name = request.data.get("name", "").strip()
+        if not name:
+            return Response({"error": "Levy name is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check for duplicate name in the same school
-        if Levy.objects.filter(school=school, name__iexact=name).exists():
+        try:
+            amount = Decimal(str(request.data.get("amount", "0")))
+        except InvalidOperation:
+            return Response({"error": "Amount must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        if not amount.is_finite() or amount < 0:
+            return Response({"error": "Amount must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+
+        session = request.tenant.session
+        if not session:
+            return Response({"error": "session not set"}, status=status.HTTP_404_NOT_FOUND)
+
+        term = request.tenant.term
+        if not term:
+            return Response({"error": "term not set"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Check for duplicate name in the same school and term
+        if Levy.objects.filter(school=school, session=session, term=term, name__iexact=name).exists():
             return Response(
                 {"error": "Levy with this name already exists."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create new subject
-        levy = Levy.objects.create(school=school, name=name)
+        # Create the levy; the assign_levy job charges it to the term's students
+        levy = Levy.objects.create(school=school, session=session, term=term, name=name, amount=amount)
         serializer = LeviesSerializer(levy)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
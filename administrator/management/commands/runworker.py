@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from administrator.jobs import claim, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs from the database job table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run every due job, then exit.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(f"Worker {worker} started.")
+
+        while True:
+            close_old_connections()
+            queued = claim(worker=worker)
+            if queued is None:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            queued = run_job(queued)
+            message = f"{queued.name} #{queued.id}: {queued.status} (attempt {queued.attempts})"
+            if queued.status == 'done':
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stdout.write(self.style.WARNING(message))
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0025_levy_amount_alter_studenttermtotalfee_levy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='levy',
+            name='session',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='administrator.academicsession'),
+        ),
+        migrations.AddField(
+            model_name='levy',
+            name='term',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='levy_fees_term', to='administrator.term'),
+        ),
+        migrations.AlterField(
+            model_name='levy',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='levy_class_levy', to='administrator.schoolprofile'),
+        ),
+        migrations.CreateModel(
+            name='ClassTermRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('class_average', models.FloatField(default=0)),
+                ('class_size', models.PositiveIntegerField(default=0)),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='administrator.classlevel')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to='administrator.academicsession')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to='administrator.student')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to='administrator.term')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['class_level', 'term', 'session'], name='administrat_class_l_c5f283_idx')],
+                'unique_together': {('student', 'term', 'session')},
+            },
+        ),
+    ]
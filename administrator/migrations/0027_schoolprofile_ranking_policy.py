@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0026_classtermranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolprofile',
+            name='ranking_policy',
+            field=models.CharField(choices=[('competition', 'Competition (1, 2, 2, 4)'), ('dense', 'Dense (1, 2, 2, 3)')], default='competition', max_length=20),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0027_schoolprofile_ranking_policy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnualResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('average', models.FloatField(default=0)),
+                ('subjects_count', models.PositiveIntegerField(default=0)),
+                ('terms_count', models.PositiveIntegerField(default=0)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('class_average', models.FloatField(default=0)),
+                ('class_size', models.PositiveIntegerField(default=0)),
+                ('grade', models.CharField(blank=True, max_length=5, null=True)),
+                ('remark', models.CharField(blank=True, max_length=255, null=True)),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='annual_results', to='administrator.classlevel')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='annual_results', to='administrator.academicsession')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='annual_results', to='administrator.student')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['class_level', 'session'], name='administrat_class_l_c974d4_idx')],
+                'unique_together': {('student', 'session')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnualSubjectResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subjects', models.CharField(max_length=20)),
+                ('term_totals', models.JSONField(default=dict)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('terms_count', models.PositiveIntegerField(default=0)),
+                ('average', models.FloatField(default=0)),
+                ('grade', models.CharField(blank=True, max_length=20, null=True)),
+                ('remark', models.CharField(blank=True, max_length=20, null=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='annual_subject_results', to='administrator.academicsession')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='annual_subject_results', to='administrator.student')),
+            ],
+            options={
+                'ordering': ['subjects'],
+                'unique_together': {('student', 'session', 'subjects')},
+            },
+        ),
+    ]
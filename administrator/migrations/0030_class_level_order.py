@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+def number_existing_classes(apps, schema_editor):
+    # Keep the progression promotion used so far: classes in creation order
+    ClassLevel = apps.get_model('administrator', 'ClassLevel')
+    positions = {}
+    changed = []
+    for class_level in ClassLevel.objects.order_by('id'):
+        positions[class_level.school_id] = positions.get(class_level.school_id, 0) + 1
+        class_level.order = positions[class_level.school_id]
+        changed.append(class_level)
+    ClassLevel.objects.bulk_update(changed, ['order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0029_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classlevel',
+            name='order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing_classes, migrations.RunPython.noop),
+    ]
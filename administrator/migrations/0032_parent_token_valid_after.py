@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0031_staged_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parent',
+            name='token_valid_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -5,12 +5,18 @@ from django.db import models
 
 
 class SchoolProfile(models.Model):
+    RANKING_POLICY_CHOICES = [
+        ('competition', 'Competition (1, 2, 2, 4)'),
+        ('dense', 'Dense (1, 2, 2, 3)'),
+    ]
+
     user = models.ManyToManyField('authentication.User')
     school_name = models.CharField(max_length=255, unique=True)
     school_address = models.CharField(max_length=255, null=True, blank=True)
     is_primary = models.BooleanField(default=False)
     is_secondary = models.BooleanField(default=False)
     logo = models.ImageField(upload_to='school_logos/', null=True, blank=True)
+    ranking_policy = models.CharField(max_length=20, choices=RANKING_POLICY_CHOICES, default='competition')
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     
     class Meta:
@@ -29,6 +35,8 @@ class SchoolProfile(models.Model):
 class ClassLevel(models.Model):
     school = models.ForeignKey(SchoolProfile, on_delete=models.SET_NULL, null=True, related_name='class_levels')
     name = models.CharField(max_length=50)
+    # Position in the school's progression: students are promoted to the next class by order
+    order = models.PositiveIntegerField(default=0)
     
     class Meta:
         ordering = ['-id']
@@ -38,6 +46,10 @@ class ClassLevel(models.Model):
         
     def save(self, *args, **kwargs):
         self.name = self.name.strip().capitalize()
+        if self.pk is None and not self.order and self.school_id:
+            # New classes go to the end of the progression
+            last = ClassLevel.objects.filter(school_id=self.school_id).aggregate(last=models.Max('order'))['last']
+            self.order = (last or 0) + 1
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -117,7 +129,8 @@ class Term(models.Model):
         return self.name
     
     
-from django.db.models import Sum
+from django.db.models import Sum, F, OuterRef, Subquery, Window
+from django.db.models.functions import DenseRank, Rank
 
 class Result(models.Model):
     student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, related_name='student_result')
@@ -146,16 +159,13 @@ class Result(models.Model):
         self.c_a = (self.first_test or 0) + (self.second_test or 0) + (self.third_test or 0)
         self.total_score = self.c_a + (self.exam or 0)
 
-        # Fetch grade from GradingSystem based on this student's school
-        school = self.session.school  # assumes session has FK to SchoolProfile
-        grading = GradingSystem.objects.filter(
-            school=school,
-            min_score__lte=self.total_score,
-            max_score__gte=self.total_score
-        ).first()
+        # Resolve grade from this school's cached grading bands
+        from .grading import get_grading_index
+        grading_index = get_grading_index(self.session.school_id)
+        grading = grading_index.resolve(self.total_score)
 
-        self.grade = grading.grade if grading else 'N/A'
-        self.remark = grading.remark if grading else 'N/A'
+        self.grade = grading[0] if grading else 'N/A'
+        self.remark = grading[1] if grading else 'N/A'
 
         # Save the result first
         super().save(*args, **kwargs)
@@ -174,14 +184,10 @@ class Result(models.Model):
         total_score = agg['total_score'] or 0
 
         # Get overall grade for the term
-        term_grading = GradingSystem.objects.filter(
-            school=school,
-            min_score__lte=total_score,
-            max_score__gte=total_score
-        ).first()
+        term_grading = grading_index.resolve(total_score)
 
-        term_grade = term_grading.grade if term_grading else 'N/A'
-        remarks = term_grading.remark if term_grading else ''
+        term_grade = term_grading[0] if term_grading else 'N/A'
+        remarks = term_grading[1] if term_grading else ''
 
         # Update or create the TermTotalMark record
         TermTotalMark.objects.update_or_create(
@@ -209,6 +215,35 @@ class Result(models.Model):
         return self.subjects
     
     
+class TermTotalMarkQuerySet(models.QuerySet):
+    def for_class(self, class_level_id, term, session):
+        return self.filter(
+            term=term,
+            session=session,
+            student__studentenrollment__class_level_id=class_level_id,
+            student__studentenrollment__session=session,
+        )
+
+    def with_class_positions(self, policy='competition'):
+        """
+        Annotate each row with its class_level_id and its position in that
+        class, ranked by total_score in the database in a single query.
+        'competition' ranks ties 1, 2, 2, 4 and 'dense' ranks them 1, 2, 2, 3.
+        """
+        enrollment = StudentEnrollment.objects.filter(
+            student=OuterRef('student'),
+            session=OuterRef('session'),
+        ).values('class_level')[:1]
+        rank = DenseRank() if policy == 'dense' else Rank()
+        return self.annotate(class_level_id=Subquery(enrollment)).annotate(
+            position=Window(
+                expression=rank,
+                partition_by=[F('term'), F('session'), F('class_level_id')],
+                order_by=F('total_score').desc(),
+            )
+        )
+
+
 class TermTotalMark(models.Model):
     student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, related_name='term_totals')
     term = models.ForeignKey(Term, on_delete=models.SET_NULL, null=True, related_name='term_totals')
@@ -222,6 +257,8 @@ class TermTotalMark(models.Model):
     grade = models.CharField(max_length=5, blank=True, null=True)
     remarks = models.CharField(max_length=255, blank=True, null=True)
 
+    objects = TermTotalMarkQuerySet.as_manager()
+
     class Meta:
         unique_together = ('student', 'term', 'session')
         ordering = ['term']
@@ -248,6 +285,77 @@ class StudentEnrollment(models.Model):
         return self.class_level.name
 
 
+class ClassTermRanking(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='class_rankings')
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, related_name='rankings')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='class_rankings')
+    session = models.ForeignKey(AcademicSession, on_delete=models.CASCADE, related_name='class_rankings')
+    total = models.PositiveIntegerField(default=0)
+    position = models.PositiveIntegerField(default=0)
+    class_average = models.FloatField(default=0)
+    class_size = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'term', 'session')
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['class_level', 'term', 'session']),
+        ]
+
+    def __str__(self):
+        if self.student:
+            return f"{self.student.name} - position {self.position}"
+        return str(self.position)
+
+
+class AnnualResult(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='annual_results')
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, related_name='annual_results')
+    session = models.ForeignKey(AcademicSession, on_delete=models.CASCADE, related_name='annual_results')
+    total = models.PositiveIntegerField(default=0)
+    average = models.FloatField(default=0)
+    subjects_count = models.PositiveIntegerField(default=0)
+    terms_count = models.PositiveIntegerField(default=0)
+    position = models.PositiveIntegerField(default=0)
+    class_average = models.FloatField(default=0)
+    class_size = models.PositiveIntegerField(default=0)
+    grade = models.CharField(max_length=5, blank=True, null=True)
+    remark = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        unique_together = ('student', 'session')
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['class_level', 'session']),
+        ]
+
+    def __str__(self):
+        if self.student:
+            return f"{self.student.name} - annual position {self.position}"
+        return str(self.position)
+
+
+class AnnualSubjectResult(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='annual_subject_results')
+    session = models.ForeignKey(AcademicSession, on_delete=models.CASCADE, related_name='annual_subject_results')
+    subjects = models.CharField(max_length=20)
+    term_totals = models.JSONField(default=dict)
+    total = models.PositiveIntegerField(default=0)
+    terms_count = models.PositiveIntegerField(default=0)
+    average = models.FloatField(default=0)
+    grade = models.CharField(max_length=20, blank=True, null=True)
+    remark = models.CharField(max_length=20, blank=True, null=True)
+
+    class Meta:
+        unique_together = ('student', 'session', 'subjects')
+        ordering = ['subjects']
+
+    def __str__(self):
+        if self.student:
+            return f"{self.student.name} - {self.subjects} annual result"
+        return self.subjects
+
+
     
 
 # settings
@@ -354,10 +462,16 @@ class Parent(models.Model):
     access_code_created = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     student = models.ManyToManyField('Student')
+    # Signed parent tokens issued before this are revoked (see administrator.parent_tokens)
+    token_valid_after = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def access_code_expires_at(self):
+        return self.access_code_created + timedelta(days=5)
 
     @property
     def access_code_expired(self):
-        return timezone.now() > self.access_code_created + timedelta(days=5)
+        return timezone.now() > self.access_code_expires_at
     
     def set_password(self, raw_password):
         self.password = make_password(raw_password)
@@ -465,4 +579,57 @@ class StudentTermTotalFee(models.Model):
         if self.student:
             return f"{self.student.name} - term fees"
         return self.remarks
-    
\ No newline at end of file
+    
+    
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    school = models.ForeignKey(SchoolProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} - {self.status}"
+
+
+class StagedUpload(models.Model):
+    """Validated result rows kept between an upload's preview and its confirm."""
+    token = models.CharField(max_length=64, unique=True)
+    school = models.ForeignKey(SchoolProfile, on_delete=models.CASCADE, related_name='staged_uploads')
+    session = models.ForeignKey(AcademicSession, on_delete=models.CASCADE, related_name='staged_uploads')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='staged_uploads')
+    # Set for a single-student upload, which may take comments on confirm
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, null=True, blank=True, related_name='staged_uploads')
+    rows_by_student = models.JSONField(default=dict)
+    summary = models.JSONField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"Staged upload #{self.id} - {'confirmed' if self.summary is not None else 'pending'}"
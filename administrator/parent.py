@@ -8,10 +8,14 @@ from rest_framework.response import Response
 from rest_framework import status, generics
 
 from administrator.models import AcademicSession, Parent, Result, SchoolProfile, Student, StudentEnrollment, Term, TermTotalMark
+from administrator.parent_dashboard import parent_dashboard
 from administrator.parent_manager import ParentAccessCodeAuthentication
+from administrator.parent_tokens import is_signed_parent_token, revoke_parent_tokens
+from administrator.report_card_cache import get_cached_report_card
+from administrator.report_cards import ReportCardBuilder, ResultsNotFound, SchoolAdminNotFound, StudentNotFound, build_annual_report
 from administrator.serializers import AcademicSessionSerializer, ParentAcademicSessionSerializer, ResultSerializer, StudentEnrollmentSerializer
 from authentication.serializers import ChangePasswordSerializer, ForgetPasswordSerializer
-from .parent_serializers import ParentCreateSerializer, ParentListSerializer, ParentLoginSerializer, ParentUpdateSerializer, StudentNestedSerializer
+from .parent_serializers import ParentCreateSerializer, ParentDashboardStudentSerializer, ParentListSerializer, ParentLoginSerializer, ParentUpdateSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 
@@ -37,7 +41,7 @@ class ParentCreateListsView(generics.ListCreateAPIView):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
         
-        school = SchoolProfile.objects.filter(user=self.request.user).first()
+        school = self.request.tenant.school
         serializer = ParentCreateSerializer(data=request.data)
         if serializer.is_valid():
             parent = serializer.save(school=school)
@@ -53,7 +57,7 @@ class ParentCreateListsView(generics.ListCreateAPIView):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
         
-        school = SchoolProfile.objects.filter(user=self.request.user).first()
+        school = self.request.tenant.school
         queryset = Parent.objects.filter(school = school)
         return queryset
 
@@ -66,6 +70,20 @@ class ParentLoginView(APIView):
             return Response(serializer.validated_data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class ParentLogoutView(APIView):
+    authentication_classes = [ParentAccessCodeAuthentication]
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Parent"])
+    def post(self, request):
+        if is_signed_parent_token(request.auth):
+            # Ends every signed session of the parent, not only this one
+            revoke_parent_tokens(request.user.id)
+        else:
+            # Rotating the access code is what ends an access-code session
+            Parent.objects.get(id=request.user.id).regenerate_access_code()
+        return Response({"message": "Logged out."}, status=status.HTTP_200_OK)
+
 from django.core.cache import cache
 from django.contrib.auth.hashers import make_password
 
@@ -174,9 +192,8 @@ class ParentChangePasswordView(generics.GenericAPIView):
             if password1 != password2:
                 return Response({'error': 'New password and confirm password do not match.'}, status=status.HTTP_400_BAD_REQUEST)
             
-            parent = request.user
             try:
-                parent = Parent.objects.get(email=parent.email)                
+                parent = Parent.objects.get(id=request.user.id)
             except Parent.DoesNotExist:
                 raise ParseError("Invalid parent Id.")
             
@@ -216,17 +233,16 @@ class ParentDashboardView(APIView):
     authentication_classes = [ParentAccessCodeAuthentication]
     @swagger_auto_schema(tags=["Parent"])
     def get(self, request):
-        parent = request.user
-        students = parent.student.all()
-        session = AcademicSession.objects.filter(school__school_name=parent.school.school_name).count()
-        school = SchoolProfile.objects.filter(school_name=parent.school.school_name).first()
-        serializer = StudentNestedSerializer(students, many=True)
+        students, school = parent_dashboard(request.user)
+        if school is None:
+            return Response({"error": "Parent is not associated with any school."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ParentDashboardStudentSerializer(students, many=True)
         return Response({
             "students":serializer.data,
             "students_count": len(students),
-            "sessions": session,
-            "school_name":school.school_name,
-            "school_location" : school.school_address or "not set"
+            "sessions": school["sessions_count"] or 0,
+            "school_name":school["school_name"],
+            "school_location" : school["school_address"] or "not set"
             }, status=status.HTTP_200_OK) 
 
 
@@ -236,14 +252,10 @@ class ParentGetSessionView(APIView):
     @swagger_auto_schema(tags=["Parent"])
     def get(self, request):
         parent = request.user
-        
-        school = SchoolProfile.objects.filter(id=parent.school.id).first()
-        if not school:
+        if not parent.school_id:
             return Response([])
-        
-        print("worked")
 
-        sessions = AcademicSession.objects.filter(school=school)
+        sessions = AcademicSession.objects.filter(school_id=parent.school_id)
         serializer = ParentAcademicSessionSerializer(sessions, many=True)
         return Response(serializer.data)
         
@@ -255,44 +267,37 @@ class ParentGetStudentsSessionView(APIView):
     def get(self, request, session_id):
         parent = request.user
         
-        session = AcademicSession.objects.filter(id=session_id).first()
-        if not session:
-            return Response({"error":"Cannot fetch school session dor students"}, status=status.HTTP_400_BAD_REQUEST)
-        if not parent.school:
+        if not parent.school_id:
             return Response(
                 {"error": "Parent is not associated with any school."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        parent_student_ids = parent.student.values_list('id', flat=True)
+        session = AcademicSession.objects.filter(id=session_id, school_id=parent.school_id).first()
+        if not session:
+            return Response({"error":"Cannot fetch school session dor students"}, status=status.HTTP_400_BAD_REQUEST)
         
-        students = StudentEnrollment.objects.filter(session = session, school = parent.school, student__id__in=parent_student_ids)
+        students = StudentEnrollment.objects.filter(session = session, school_id = parent.school_id, student__id__in=parent.student_ids)
         serializer = StudentEnrollmentSerializer(students, many=True)
         return Response(serializer.data)
     
     
-from django.db.models import Sum, Count, F
-from django.db.models.functions import Coalesce
-
-def ordinal(n):
-    return f"{n}{'tsnrhtdd'[(n//10%10!=1)*(n%10<4)*n%10::4]}"
 class ParentShowStudentResultView(APIView):
     authentication_classes = [ParentAccessCodeAuthentication]
     @swagger_auto_schema(tags=["Parent"])
     def post(self, request, student_id, session_id, term_id):
-        try:
-            student = Student.objects.get(id=student_id)
-        except Student.DoesNotExist:
-            return Response({"error": "Invalid student"}, status=404)
         parent = request.user
-        school = SchoolProfile.objects.filter(id=parent.school.id).first()
+        if student_id not in parent.student_ids:
+            return Response({"error": "Invalid student"}, status=404)
+        
+        # Published report cards are served straight from the cache
+        cached = get_cached_report_card(parent.school_id, student_id, term_id, session_id)
+        if cached and cached['show']:
+            return Response(cached['report_card'])
+        
+        school = SchoolProfile.objects.filter(id=parent.school_id).first()
         if not school:
             return Response({"error": "School profile not found."}, status=404)
         
-        admin_user = school.user.filter(is_admin=True).first()
-        if not admin_user:
-            return Response({"error": "No admin user found for this school."}, status=404)
-        
         session = AcademicSession.objects.filter(school = school, id=session_id).first()
         if not session:
             return Response({"error": "session not available"}, status=404)
@@ -304,95 +309,42 @@ class ParentShowStudentResultView(APIView):
         if not term:
             return Response({"error": "term not available"}, status=404)
         
-        results = Result.objects.filter(student=student, term=term, session=session)
-        if not results.exists():
+        try:
+            report_card = ReportCardBuilder(school, session, term).get(student_id)
+        except StudentNotFound:
+            return Response({"error": "Invalid student"}, status=404)
+        except SchoolAdminNotFound:
+            return Response({"error": "No admin user found for this school."}, status=404)
+        except ResultsNotFound:
             return Response({"error": "No results found for this student in the selected term and session."}, status=400)
-        results_serializer = ResultSerializer(results, many=True)
-        
-        # Comments
-        resultSummary = TermTotalMark.objects.filter(student=student, term=term, session=session).first()
-        
-        class_name = StudentEnrollment.objects.filter(student=student, school=school, session=session).first()    
-        
-        # Total score for the student
-        total_score = results.aggregate(total=Coalesce(Sum('total_score'), 0))['total']
-        subjects_count = results.count()
-        total_possible = subjects_count * 100
-        average_score = round((total_score / total_possible) * 100, 2) if total_possible else 0
-        
-        class_results = None
-        student_ids_in_class = None
-        # Class-level stats
-        class_enrollment = StudentEnrollment.objects.filter(student=student, school=school, session=session).first()
-        if class_enrollment:
-            student_ids_in_class = StudentEnrollment.objects.filter(
-                class_level=class_enrollment.class_level,
-                session=session,
-                school=school
-            ).values_list('student', flat=True)
-
-            # Get all results for those students in the given session and term
-            class_results = Result.objects.filter(
-                student_id__in=student_ids_in_class,
-                session=session,
-                term=term
-            )
-        else:
-            class_results = Result.objects.none()
         
+        return Response(report_card)
+    
+    
+class ParentShowStudentAnnualResultView(APIView):
+    authentication_classes = [ParentAccessCodeAuthentication]
+    @swagger_auto_schema(tags=["Parent"])
+    def get(self, request, student_id, session_id):
+        parent = request.user
+        if student_id not in parent.student_ids:
+            return Response({"error": "Invalid student"}, status=404)
         
-        # Compute each student's total
-        student_scores = (
-            class_results.values('student_id')
-            .annotate(total=Coalesce(Sum('total_score'), 0))
-            .order_by('-total')
-        )
+        school = SchoolProfile.objects.filter(id=parent.school_id).first()
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
         
+        session = AcademicSession.objects.filter(school = school, id=session_id).first()
+        if not session:
+            return Response({"error": "session not available"}, status=404)
         
-        # Calculate position
-        student_position = 1
-        for idx, data in enumerate(student_scores, start=1):
-            if data['student_id'] == student.id:
-                student_position = idx
-                break
-            
-        # Class average
-        class_total = class_results.aggregate(class_total=Coalesce(Sum('total_score'), 0))['class_total']
-        total_subjects = class_results.count()
-        student_total_count = student_ids_in_class.count()
-        class_avg = round((class_total / (student_total_count * 100 * subjects_count)) * 100, 2) if student_total_count and subjects_count else 0
-
+        if not session.show:
+            return Response({"error": "session result is not available for now"}, status=404)
         
+        try:
+            annual_report = build_annual_report(school, session, student_id)
+        except StudentNotFound:
+            return Response({"error": "Invalid student"}, status=404)
+        except ResultsNotFound:
+            return Response({"error": "No results found for this student in the selected session."}, status=400)
         
-        return Response({
-            "school_info": {
-                "school_name": school.school_name,
-                "location": school.school_address or "Not Set",
-                "phone": admin_user.phone ,
-                "email":  admin_user.email
-            },
-            "academic_sessions" : {
-                "session": session.name,
-                "term": term.name,
-                "resumptionDate": session.next_term_date
-            },
-            "student" : {
-                "student_name" : student.name,
-                "other_info" : student.other_info,
-                "class" : class_name.class_level.name or "not set"
-            },
-            "results" : results_serializer.data,
-            "performance_summary": {
-                "total_score": total_score,
-                "out_of": total_possible,
-                "average_score": f"{average_score}%",
-                "class_average": f"{class_avg}%",
-                "position": ordinal(student_position),
-                "out_of_students": student_total_count
-            },
-            "comments":{
-                "principal_comment": resultSummary.principal_comment if resultSummary and resultSummary.principal_comment else "Not Set",
-                "teacher_comment": resultSummary.teacher_comment if resultSummary and resultSummary.teacher_comment else "Not Set",
-
-            }
-        })
\ No newline at end of file
+        return Response(annual_report)
@@ -0,0 +1,101 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Parent
+
+
+PARENT_CACHE_TIMEOUT = 60 * 60
+
+
+def _access_key(access_code):
+    # Hashed, so access codes never appear in cache keys
+    return 'parent_access_' + hashlib.sha256(access_code.encode()).hexdigest()
+
+
+def _parent_key(parent_id):
+    return f'parent_access_key_{parent_id}'
+
+
+class ParentPrincipal:
+    """
+    The authenticated parent of a portal request, built from a cached
+    snapshot: id, school_id, student_ids, name and email need no query. Any
+    other attribute (student, school, check_password) loads the Parent row.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.id = self.pk = snapshot['id']
+        self.school_id = snapshot['school_id']
+        self.student_ids = frozenset(snapshot['student_ids'])
+        self.name = snapshot['name']
+        self.email = snapshot['email']
+        self.expires_at = snapshot['expires_at']
+
+    @cached_property
+    def instance(self):
+        return Parent.objects.get(pk=self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'snapshot':
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+    def __str__(self):
+        return self.name
+
+
+def snapshot_parent(parent):
+    return {
+        'id': parent.id,
+        'school_id': parent.school_id,
+        'student_ids': list(parent.student.values_list('id', flat=True)),
+        'name': parent.name,
+        'email': parent.email,
+        'expires_at': parent.access_code_expires_at,
+    }
+
+
+def get_parent_snapshot(access_code):
+    """
+    The snapshot of the active parent holding access_code, or None. Cached
+    until the code expires (at most PARENT_CACHE_TIMEOUT), so only the first
+    request with a code queries the database.
+    """
+    snapshot = cache.get(_access_key(access_code))
+    if snapshot is not None:
+        return snapshot
+
+    parent = Parent.objects.filter(access_code=access_code, is_active=True).first()
+    if parent is None:
+        return None
+
+    snapshot = snapshot_parent(parent)
+    timeout = min(PARENT_CACHE_TIMEOUT, int((snapshot['expires_at'] - timezone.now()).total_seconds()))
+    if timeout > 0:
+        cache.set(_access_key(access_code), snapshot, timeout)
+        cache.set(_parent_key(parent.id), _access_key(access_code), timeout)
+    return snapshot
+
+
+def _forget(parent_ids):
+    keys = [_parent_key(parent_id) for parent_id in parent_ids]
+    access_keys = [access_key for access_key in cache.get_many(keys).values() if access_key]
+    cache.delete_many(keys + access_keys)
+
+
+def forget_parent(*parent_ids):
+    """
+    Drop the cached snapshots of the parents' access codes (new code,
+    deactivation, students changed). Again on commit, in case a request
+    cached the old rows before the change committed.
+    """
+    _forget(parent_ids)
+    transaction.on_commit(lambda: _forget(parent_ids))
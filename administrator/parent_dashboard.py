@@ -0,0 +1,63 @@
+from django.db.models import Count, OuterRef, Subquery
+
+from .models import AcademicSession, SchoolProfile, Student, StudentEnrollment, TermTotalMark
+from .tenancy import get_current_period
+
+
+def _school_summary(school_id):
+    school = SchoolProfile.objects.filter(id=school_id)
+    sessions = (
+        AcademicSession.objects.filter(school_id=school_id)
+        .order_by().values('school').annotate(count=Count('id')).values('count')
+    )
+    return school, sessions
+
+
+def parent_dashboard(parent):
+    """
+    Everything the parent portal's dashboard shows, in one query: the
+    parent's children with their class in the school's current session and
+    their latest published term total, plus the school's name, address and
+    number of sessions. parent is the cached principal from
+    ParentAccessCodeAuthentication, so the children and school need no lookup.
+    """
+    school, sessions = _school_summary(parent.school_id)
+    students = _annotated_students(parent, school, sessions) if parent.student_ids else []
+    if not students:
+        summary = school.annotate(sessions_count=Subquery(sessions)).values(
+            'school_name', 'school_address', 'sessions_count'
+        ).first()
+        return [], summary
+
+    # The school columns are the same on every row
+    summary = {
+        'school_name': students[0].school_name,
+        'school_address': students[0].school_address,
+        'sessions_count': students[0].sessions_count,
+    }
+    return students, summary
+
+
+def _annotated_students(parent, school, sessions):
+    current_session, _ = get_current_period(parent.school_id)
+    current_class = StudentEnrollment.objects.filter(
+        student=OuterRef('pk'), session_id=current_session.id if current_session else None,
+    ).values('class_level__name')[:1]
+    # Only sessions the school has released to parents
+    latest_total = TermTotalMark.objects.filter(
+        student=OuterRef('pk'), session__show=True,
+    ).order_by('-session_id', '-term_id')
+
+    return list(
+        Student.objects.filter(id__in=parent.student_ids)
+        .annotate(
+            current_class=Subquery(current_class),
+            latest_session=Subquery(latest_total.values('session__name')[:1]),
+            latest_term=Subquery(latest_total.values('term__name')[:1]),
+            latest_total_score=Subquery(latest_total.values('total_score')[:1]),
+            latest_grade=Subquery(latest_total.values('grade')[:1]),
+            school_name=Subquery(school.values('school_name')[:1]),
+            school_address=Subquery(school.values('school_address')[:1]),
+            sessions_count=Subquery(sessions),
+        )
+    )
@@ -1,7 +1,8 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils import timezone
-from .models import Parent
+from .parent_cache import ParentPrincipal, get_parent_snapshot
+from .parent_tokens import is_signed_parent_token, read_parent_token
 
 class ParentAccessCodeAuthentication(BaseAuthentication):
     def authenticate(self, request):
@@ -9,14 +10,18 @@ class ParentAccessCodeAuthentication(BaseAuthentication):
         if not access_code:
             return None
 
-        try:
-            parent = Parent.objects.get(access_code=access_code, is_active =True)
-        except Parent.DoesNotExist:
-            raise AuthenticationFailed('Invalid parent access code.')
+        if is_signed_parent_token(access_code):
+            # Signed session token: verified from its signature and the cached revocations
+            snapshot = read_parent_token(access_code)
+            if snapshot is None:
+                raise AuthenticationFailed('Invalid or expired parent session.')
+        else:
+            # Cached snapshot of the parent, so portal requests don't query the Parent table
+            snapshot = get_parent_snapshot(access_code)
+            if snapshot is None:
+                raise AuthenticationFailed('Invalid parent access code.')
 
-        if parent.access_code_expired:
+        if timezone.now() > snapshot['expires_at']:
             raise AuthenticationFailed('Access code has expired.')
 
-        return (parent, None)
-
-
+        return (ParentPrincipal(snapshot), access_code)
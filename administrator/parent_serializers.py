@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Parent, SchoolProfile, Student
+from .parent_tokens import issue_parent_token
 from rest_framework.exceptions import ParseError
 
 
@@ -52,12 +54,20 @@ class ParentLoginSerializer(serializers.Serializer):
         if not parent.check_password(password):
             raise ParseError("Invalid email or password.")
 
-        # Generate a new access code on login
-        parent.regenerate_access_code()
+        if settings.PARENT_SIGNED_TOKENS:
+            if not parent.is_active:
+                raise ParseError("Account is inactive.")
+            # Stateless session: nothing is written on login
+            access_code, expires_at = issue_parent_token(parent)
+        else:
+            # Generate a new access code on login
+            parent.regenerate_access_code()
+            access_code, expires_at = parent.access_code, parent.access_code_expires_at
 
         return {
             "parent_name": parent.name,
-            "access_code": parent.access_code,
+            "access_code": access_code,
+            "expires_at": expires_at,
             "school_name":school.school_name,
             "school_location" : school.school_address
         }
@@ -69,6 +79,25 @@ class StudentNestedSerializer(serializers.ModelSerializer):
         model = Student
         fields = ['id', 'name', 'other_info']
 
+class ParentDashboardStudentSerializer(serializers.ModelSerializer):
+    current_class = serializers.CharField(read_only=True)
+    latest_result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Student
+        fields = ['id', 'name', 'other_info', 'current_class', 'latest_result']
+
+    def get_latest_result(self, obj):
+        # Annotated by administrator.parent_dashboard; None until a session is published
+        if obj.latest_total_score is None:
+            return None
+        return {
+            'session': obj.latest_session,
+            'term': obj.latest_term,
+            'total_score': obj.latest_total_score,
+            'grade': obj.latest_grade,
+        }
+
 class ParentListSerializer(serializers.ModelSerializer):
     students = StudentNestedSerializer(many=True, source='student')
 
@@ -0,0 +1,108 @@
+import secrets
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Parent
+from .parent_cache import snapshot_parent
+
+
+PARENT_TOKEN_SALT = 'administrator.parent_token'
+
+# valid-after of parents that were deleted or deactivated, so none of their tokens validate
+REVOKED = float('inf')
+
+
+def _valid_after_key(parent_id):
+    return f'parent_token_valid_after_{parent_id}'
+
+
+def is_signed_parent_token(value):
+    # Access codes are letters and digits only; signed values always contain the ':' separator
+    return ':' in value
+
+
+def issue_parent_token(parent):
+    """
+    A signed session token carrying the parent's snapshot, verified later
+    without loading the parent. Returns (token, expires_at).
+    """
+    issued_at = time.time()
+    expires_at = issued_at + settings.PARENT_TOKEN_LIFETIME.total_seconds()
+    snapshot = snapshot_parent(parent)
+    payload = {
+        'id': snapshot['id'],
+        'school_id': snapshot['school_id'],
+        'student_ids': snapshot['student_ids'],
+        'name': snapshot['name'],
+        'email': snapshot['email'],
+        'iat': issued_at,
+        'exp': expires_at,
+        'jti': secrets.token_hex(8),
+    }
+    token = signing.dumps(payload, salt=PARENT_TOKEN_SALT, compress=True)
+    return token, datetime.fromtimestamp(expires_at, tz=dt_timezone.utc)
+
+
+def get_token_valid_after(parent_id):
+    """
+    The time before which the parent's tokens are revoked, as a timestamp,
+    through the shared cache. Parent.token_valid_after is the record, so a
+    flushed or evicted cache entry is reloaded rather than forgotten.
+    """
+    valid_after = cache.get(_valid_after_key(parent_id))
+    if valid_after is None:
+        parent = Parent.objects.filter(id=parent_id).values('is_active', 'token_valid_after').first()
+        if parent is None or not parent['is_active']:
+            valid_after = REVOKED
+        elif parent['token_valid_after'] is None:
+            valid_after = 0
+        else:
+            valid_after = parent['token_valid_after'].timestamp()
+        cache.set(_valid_after_key(parent_id), valid_after, int(settings.PARENT_TOKEN_LIFETIME.total_seconds()))
+    return valid_after
+
+
+def read_parent_token(token):
+    """
+    The parent snapshot of a valid token, or None if the signature doesn't
+    match or the token expired or was revoked.
+    """
+    try:
+        payload = signing.loads(token, salt=PARENT_TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+
+    if time.time() > payload['exp']:
+        return None
+
+    if payload['iat'] <= get_token_valid_after(payload['id']):
+        return None
+
+    return {
+        'id': payload['id'],
+        'school_id': payload['school_id'],
+        'student_ids': payload['student_ids'],
+        'name': payload['name'],
+        'email': payload['email'],
+        'expires_at': datetime.fromtimestamp(payload['exp'], tz=dt_timezone.utc),
+        'jti': payload['jti'],
+    }
+
+
+def revoke_parent_tokens(*parent_ids):
+    """
+    Revoke every token issued so far to the parents (logout, deactivation,
+    students or password changed). Recorded on the Parent rows, so a cache
+    flush doesn't bring the tokens back.
+    """
+    Parent.objects.filter(id__in=parent_ids).update(token_valid_after=timezone.now())
+    keys = [_valid_after_key(parent_id) for parent_id in parent_ids]
+    # Again on commit, in case a request cached the old value before the change committed
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
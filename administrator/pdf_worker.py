@@ -0,0 +1,19 @@
+"""
+Runs inside the printout process pool. Kept free of Django imports so
+spawned workers start fast and never touch the database.
+"""
+
+
+def _offline_url_fetcher(url, *args, **kwargs):
+    # Printouts must render without network access (e.g. no Google Fonts)
+    if url.startswith(('http://', 'https://')):
+        raise ValueError(f'Refusing to fetch {url} while rendering a printout')
+    from weasyprint import default_url_fetcher
+
+    return default_url_fetcher(url, *args, **kwargs)
+
+
+def html_to_pdf(html):
+    from weasyprint import HTML
+
+    return HTML(string=html, url_fetcher=_offline_url_fetcher).write_pdf()
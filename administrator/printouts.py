@@ -0,0 +1,148 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.text import get_valid_filename
+
+from .pdf_worker import html_to_pdf
+
+
+PRINTOUT_TEMPLATE = 'resultPrintout.html'
+
+# How often a process sweeps the printout directory
+PRUNE_INTERVAL = 60 * 10
+
+_executor = None
+_lock = threading.Lock()
+_last_pruned = 0
+
+
+class PrintoutUnavailable(Exception):
+    pass
+
+
+def get_executor():
+    # Spawned, not forked: the request worker may hold threads and DB connections
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PRINTOUT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def render_report_card_html(report_card):
+    return render_to_string(PRINTOUT_TEMPLATE, {'card': report_card, 'offline': True})
+
+
+def printout_filename(report_card):
+    name = f"{report_card['student']['student_name']}_{report_card['academic_sessions']['term']}"
+    return get_valid_filename(f"{name}.pdf")
+
+
+def _cached_path(html):
+    # Keyed by the rendered content, so any result or comment change gets a new file
+    digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    return os.path.join(settings.PRINTOUT_CACHE_DIR, f'{digest}.pdf')
+
+
+def render_pdfs(report_cards):
+    """
+    Render report cards to PDF files in the process pool, reusing files
+    already rendered for the same content. Returns the paths in order.
+    """
+    global _executor
+    os.makedirs(settings.PRINTOUT_CACHE_DIR, exist_ok=True)
+
+    paths = []
+    pending = {}
+    for report_card in report_cards:
+        html = render_report_card_html(report_card)
+        path = _cached_path(html)
+        paths.append(path)
+        if path in pending:
+            continue
+        try:
+            # Reused files count as fresh for pruning
+            os.utime(path)
+        except FileNotFoundError:
+            pending[path] = get_executor().submit(html_to_pdf, html)
+
+    for path, future in pending.items():
+        try:
+            pdf = future.result()
+        except BrokenProcessPool as exc:
+            with _lock:
+                _executor = None
+            raise PrintoutUnavailable("The printout workers stopped unexpectedly.") from exc
+        except (ImportError, OSError) as exc:
+            raise PrintoutUnavailable("PDF rendering is not available on this server.") from exc
+
+        partial_path = f'{path}.{os.getpid()}.part'
+        with open(partial_path, 'wb') as pdf_file:
+            pdf_file.write(pdf)
+        os.replace(partial_path, path)
+
+    prune_printouts(keep=paths)
+    return paths
+
+
+def prune_printouts(keep=(), force=False):
+    """
+    Delete printouts older than PRINTOUT_CACHE_MAX_AGE, then the least
+    recently used ones until the directory fits PRINTOUT_CACHE_MAX_BYTES.
+    Runs at most every PRUNE_INTERVAL per process unless forced; the paths
+    in keep are about to be sent and are never deleted.
+    """
+    global _last_pruned
+    now = time.time()
+    if not force and now - _last_pruned < PRUNE_INTERVAL:
+        return
+    _last_pruned = now
+
+    files = []
+    with os.scandir(settings.PRINTOUT_CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    keep = set(keep)
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in sorted(files):
+        if path in keep:
+            continue
+        if now - mtime < settings.PRINTOUT_CACHE_MAX_AGE and total <= settings.PRINTOUT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def build_printout_zip(report_cards, paths):
+    """Bundle rendered PDFs into a temporary zip file, rewound for streaming."""
+    archive = tempfile.TemporaryFile()
+    used_names = set()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as bundle:
+        for report_card, path in zip(report_cards, paths):
+            filename = printout_filename(report_card)
+            stem, counter = filename[:-4], 2
+            while filename in used_names:
+                filename = f"{stem}_{counter}.pdf"
+                counter += 1
+            used_names.add(filename)
+            bundle.write(path, arcname=filename)
+    archive.seek(0)
+    return archive
@@ -0,0 +1,162 @@
+from django.db import transaction
+
+from .models import AcademicSession, ClassLevel, StudentEnrollment
+from .query_counter import QueryCounter
+from .report_card_cache import bump_school_report_cards, forget_student_class
+
+
+BATCH_SIZE = 500
+
+
+def class_progression(school):
+    """The school's classes in promotion order; classes sharing a position keep creation order."""
+    return list(ClassLevel.objects.filter(school=school).order_by('order', 'id').only('id', 'name', 'order'))
+
+
+def previous_session_for(school, session):
+    return (
+        AcademicSession.objects.filter(school=school)
+        .exclude(id=session.id)
+        .filter(created_at__lte=session.created_at)
+        .order_by('-created_at', '-id')
+        .first()
+    )
+
+
+def build_promotion_plan(school, source_session, target_session=None):
+    """
+    Work out every promotion from source_session into target_session in
+    memory: one query for the progression, one for the source enrollments
+    and one for the students already enrolled in the target. Returns the
+    StudentEnrollment rows to create (unsaved) and a summary per class.
+
+    Students in the last class graduate, and students already enrolled in
+    the target session are left alone, so running a plan twice is harmless.
+    Without a target session the plan is what a new session would get.
+    """
+    progression = class_progression(school)
+    next_level = {current.id: following for current, following in zip(progression, progression[1:])}
+
+    already_enrolled = set()
+    if target_session is not None:
+        already_enrolled = set(
+            StudentEnrollment.objects.filter(school=school, session=target_session, student__isnull=False)
+            .values_list('student_id', flat=True)
+        )
+
+    classes = {
+        class_level.id: {
+            'class_level_id': class_level.id,
+            'class_level': class_level.name,
+            'order': class_level.order,
+            'promote_to_id': next_level[class_level.id].id if class_level.id in next_level else None,
+            'promote_to': next_level[class_level.id].name if class_level.id in next_level else None,
+            'students': 0,
+            'promoted': 0,
+            'graduating': 0,
+            'already_enrolled': 0,
+        }
+        for class_level in progression
+    }
+
+    enrollments = []
+    seen = set()
+    rows = (
+        StudentEnrollment.objects.filter(
+            school=school, session=source_session, student__isnull=False, class_level_id__in=classes
+        )
+        .order_by('id')
+        .values_list('student_id', 'class_level_id')
+    )
+    for student_id, class_level_id in rows:
+        if student_id in seen:
+            continue
+        seen.add(student_id)
+
+        summary = classes[class_level_id]
+        summary['students'] += 1
+        if student_id in already_enrolled:
+            summary['already_enrolled'] += 1
+        elif class_level_id not in next_level:
+            summary['graduating'] += 1
+        else:
+            summary['promoted'] += 1
+            enrollments.append(StudentEnrollment(
+                student_id=student_id,
+                class_level_id=next_level[class_level_id].id,
+                school=school,
+                session=target_session,
+            ))
+
+    return enrollments, list(classes.values())
+
+
+def promote_students(school, session, dry_run=False):
+    """
+    Enrol the students of the session before session into their next class.
+    With dry_run nothing is written and the summary is what would happen.
+    """
+    source_session = previous_session_for(school, session)
+    if source_session is None:
+        return None
+
+    with QueryCounter() as counter:
+        with transaction.atomic():
+            if not dry_run:
+                # Serialises overlapping runs for this session, so the second sees the first's enrollments
+                AcademicSession.objects.select_for_update().filter(id=session.id).exists()
+            enrollments, classes = build_promotion_plan(school, source_session, session)
+            if not dry_run:
+                StudentEnrollment.objects.bulk_create(enrollments, batch_size=BATCH_SIZE)
+
+    if not dry_run and enrollments:
+        # bulk_create skips the StudentEnrollment signals
+        for enrollment in enrollments:
+            forget_student_class(enrollment.student_id, session.id)
+        bump_school_report_cards(school.id)
+
+    return promotion_summary(source_session, session, classes, dry_run, counter)
+
+
+def preview_promotion(school, session=None):
+    """
+    Dry run of a promotion. With a session it is the promotion into that
+    session; without one it is what starting a new session would do to the
+    school's latest session.
+    """
+    if session is not None:
+        return promote_students(school, session, dry_run=True)
+
+    source_session = AcademicSession.objects.filter(school=school).order_by('-created_at', '-id').first()
+    if source_session is None:
+        return None
+
+    with QueryCounter() as counter:
+        _, classes = build_promotion_plan(school, source_session)
+    return promotion_summary(source_session, None, classes, True, counter)
+
+
+def set_class_progression(school, class_level_ids):
+    """Renumber the school's classes in the given order. Returns False if the ids aren't exactly the school's classes."""
+    class_levels = {class_level.id: class_level for class_level in ClassLevel.objects.filter(school=school)}
+    if len(class_level_ids) != len(class_levels) or set(class_level_ids) != set(class_levels):
+        return False
+
+    for position, class_level_id in enumerate(class_level_ids, start=1):
+        class_levels[class_level_id].order = position
+    ClassLevel.objects.bulk_update(class_levels.values(), ['order'], batch_size=BATCH_SIZE)
+    return True
+
+
+def promotion_summary(source_session, target_session, classes, dry_run, counter):
+    return {
+        'from_session': source_session.name,
+        'to_session': target_session.name if target_session else None,
+        'dry_run': dry_run,
+        'classes': classes,
+        'promoted': sum(summary['promoted'] for summary in classes),
+        'graduating': sum(summary['graduating'] for summary in classes),
+        'already_enrolled': sum(summary['already_enrolled'] for summary in classes),
+        'query_count': counter.count,
+        'elapsed_seconds': counter.elapsed,
+    }
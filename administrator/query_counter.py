@@ -0,0 +1,31 @@
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class QueryCounter:
+    """
+    Count the SQL statements run inside a ``with`` block and time it.
+    Works with DEBUG off, so it can be reported back from real endpoints.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.count = 0
+        self._started = time.perf_counter()
+        self._wrapper = connections[self.using].execute_wrapper(self._count)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        self.elapsed = round(time.perf_counter() - self._started, 4)
+        return False
+
+    def _count(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
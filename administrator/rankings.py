@@ -0,0 +1,146 @@
+from threading import local
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .annual_results import refresh_class_annual
+from .models import AnnualResult, AnnualSubjectResult, ClassLevel, ClassTermRanking, StudentEnrollment, TermTotalMark
+from .report_card_cache import bump_class_report_cards
+
+
+def refresh_class_ranking(class_level_id, term_id, session_id, policy=None):
+    """
+    Rebuild the ClassTermRanking rows of one class for a term from the
+    students' TermTotalMark totals, ranked with the school's tie policy.
+    """
+    if policy is None:
+        policy = (
+            ClassLevel.objects.filter(id=class_level_id).values_list('school__ranking_policy', flat=True).first()
+            or 'competition'
+        )
+
+    student_ids = set(
+        StudentEnrollment.objects.filter(class_level_id=class_level_id, session_id=session_id)
+        .values_list('student_id', flat=True)
+    )
+    student_ids.discard(None)
+
+    totals = list(
+        TermTotalMark.objects.filter(student_id__in=student_ids, term_id=term_id, session_id=session_id)
+        .with_class_positions(policy)
+        .values_list('student_id', 'total_score', 'position')
+    )
+
+    class_size = len(student_ids)
+    class_total = sum(total for _, total, _ in totals)
+    class_average = class_total / class_size if class_size else 0
+
+    rankings = [
+        ClassTermRanking(
+            student_id=student_id,
+            class_level_id=class_level_id,
+            term_id=term_id,
+            session_id=session_id,
+            total=total,
+            position=position,
+            class_average=class_average,
+            class_size=class_size,
+        )
+        for student_id, total, position in totals
+    ]
+
+    with transaction.atomic():
+        ClassTermRanking.objects.filter(
+            Q(class_level_id=class_level_id) | Q(student_id__in=student_ids),
+            term_id=term_id,
+            session_id=session_id,
+        ).delete()
+        ClassTermRanking.objects.bulk_create(rankings)
+
+    # The term totals feed the session's cumulative results as well
+    refresh_class_annual(class_level_id, session_id, policy=policy)
+
+    # Positions and class averages moved for everyone in the class
+    bump_class_report_cards(class_level_id, term_id, session_id)
+    return rankings
+
+
+RANKING_MISS_TIMEOUT = 60 * 60 * 24
+
+
+def _ranking_miss_key(student_id, session_id):
+    return f'ranking_miss_{student_id}_{session_id}'
+
+
+def forget_ranking_misses(student_ids, session_id):
+    cache.delete_many([_ranking_miss_key(student_id, session_id) for student_id in student_ids])
+
+
+def refresh_rankings_for_students(student_ids, term_id, session_id):
+    """Refresh every class the given students are enrolled in for the session."""
+    forget_ranking_misses(student_ids, session_id)
+    classes = dict(
+        StudentEnrollment.objects.filter(student_id__in=student_ids, session_id=session_id, class_level__isnull=False)
+        .values_list('class_level_id', 'class_level__school__ranking_policy')
+    )
+
+    for class_level_id, policy in classes.items():
+        refresh_class_ranking(class_level_id, term_id, session_id, policy=policy)
+
+    if not classes:
+        ClassTermRanking.objects.filter(student_id__in=student_ids, term_id=term_id, session_id=session_id).delete()
+        AnnualResult.objects.filter(student_id__in=student_ids, session_id=session_id).delete()
+        AnnualSubjectResult.objects.filter(student_id__in=student_ids, session_id=session_id).delete()
+
+
+# (term_id, session_id) -> student ids whose classes refresh when this thread's transaction commits
+_pending = local()
+
+
+def _refresh_pending():
+    pending, _pending.students = getattr(_pending, 'students', {}), {}
+    for (term_id, session_id), student_ids in pending.items():
+        refresh_rankings_for_students(student_ids, term_id, session_id)
+
+
+def schedule_ranking_refresh(student_ids, term_id, session_id):
+    """
+    Refresh the students' classes once the current transaction commits, so
+    any number of TermTotalMark writes in one transaction cost one rebuild
+    per class and term. Outside a transaction the refresh runs right away.
+    """
+    if not hasattr(_pending, 'students'):
+        _pending.students = {}
+    _pending.students.setdefault((term_id, session_id), set()).update(student_ids)
+    # Registered with every write: the first callback to run refreshes everything
+    # pending and the rest find nothing. Entries left by a rolled-back
+    # transaction are refreshed from the committed data on the next commit.
+    transaction.on_commit(_refresh_pending)
+
+
+def clear_school_rankings(school_id):
+    """Drop a school's term and annual rankings, e.g. after its tie policy changed; they are rebuilt on the next read."""
+    ClassTermRanking.objects.filter(class_level__school_id=school_id).delete()
+    AnnualResult.objects.filter(class_level__school_id=school_id).delete()
+
+
+def get_student_ranking(student_id, term_id, session_id):
+    """
+    Read one student's ranking with a single indexed lookup; classes that
+    were never ranked (data from before the table existed) are built on demand.
+    A term total or enrollment change forgets a remembered miss.
+    """
+    ranking = ClassTermRanking.objects.filter(student_id=student_id, term_id=term_id, session_id=session_id).first()
+    if ranking is not None:
+        return ranking
+
+    # Students without a term total have no ranking; remember that instead of rebuilding on every read
+    missed_terms = cache.get(_ranking_miss_key(student_id, session_id), set())
+    if term_id in missed_terms:
+        return None
+    refresh_rankings_for_students([student_id], term_id, session_id)
+    ranking = ClassTermRanking.objects.filter(student_id=student_id, term_id=term_id, session_id=session_id).first()
+    if ranking is None:
+        cache.set(_ranking_miss_key(student_id, session_id), missed_terms | {term_id}, RANKING_MISS_TIMEOUT)
+    return ranking
@@ -0,0 +1,90 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+REPORT_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _student_class_key(student_id, session_id):
+    return f'report_card_class_{student_id}_{session_id}'
+
+
+def _class_version_key(class_level_id, term_id, session_id):
+    return f'report_card_version_{class_level_id}_{term_id}_{session_id}'
+
+
+def _school_version_key(school_id):
+    return f'report_card_school_version_{school_id}'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, REPORT_CARD_CACHE_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+def report_card_cache_key(school_id, student_id, term_id, session_id):
+    """
+    The cache key of a report card under the current school and class-term
+    versions, or None while the student's class is not known yet.
+    """
+    class_level_id = cache.get(_student_class_key(student_id, session_id))
+    if class_level_id is None:
+        return None
+    school_version = _get_version(_school_version_key(school_id))
+    class_version = _get_version(_class_version_key(class_level_id, term_id, session_id))
+    return f'report_card_{student_id}_{term_id}_{session_id}_{school_version}_{class_version}'
+
+
+def get_cached_report_card(school_id, student_id, term_id, session_id):
+    key = report_card_cache_key(school_id, student_id, term_id, session_id)
+    if key is None:
+        return None
+    entry = cache.get(key)
+    if entry is None or entry['school_id'] != school_id:
+        return None
+    return entry
+
+
+def cache_report_card(school_id, class_level_id, student_id, term_id, session_id, entry, key=None):
+    """
+    Store a built report card. Pass the key read before building so a write
+    that lands during the build leaves this entry behind an old version.
+    """
+    cache.set(_student_class_key(student_id, session_id), class_level_id or 0, REPORT_CARD_CACHE_TIMEOUT)
+    if key is None:
+        key = report_card_cache_key(school_id, student_id, term_id, session_id)
+    cache.set(key, entry, REPORT_CARD_CACHE_TIMEOUT)
+
+
+def _now_and_on_commit(func):
+    # Again on commit when inside a transaction, in case a read cached the uncommitted state in between
+    func()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(func)
+
+
+def bump_class_report_cards(class_level_id, term_id, session_id):
+    key = _class_version_key(class_level_id, term_id, session_id)
+    _now_and_on_commit(lambda: cache.set(key, time.time_ns(), REPORT_CARD_CACHE_TIMEOUT))
+
+
+def bump_school_report_cards(school_id):
+    key = _school_version_key(school_id)
+    _now_and_on_commit(lambda: cache.set(key, time.time_ns(), REPORT_CARD_CACHE_TIMEOUT))
+
+
+def bump_student_report_cards(student_id, term_id, session_id):
+    """Invalidate one student's card without a query: it is only cached while their class is."""
+    class_level_id = cache.get(_student_class_key(student_id, session_id))
+    if class_level_id is not None:
+        bump_class_report_cards(class_level_id, term_id, session_id)
+
+
+def forget_student_class(student_id, session_id):
+    _now_and_on_commit(lambda: cache.delete(_student_class_key(student_id, session_id)))
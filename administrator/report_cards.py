@@ -0,0 +1,223 @@
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from .annual_results import get_student_annual
+from .models import ClassTermRanking, Result, Student, StudentEnrollment, TermTotalMark
+from .rankings import get_student_ranking, refresh_class_ranking
+from .report_card_cache import cache_report_card, report_card_cache_key
+from .serializers import AnnualSubjectResultSerializer, ResultSerializer
+
+
+def ordinal(n):
+    return f"{n}{'tsnrhtdd'[(n//10%10!=1)*(n%10<4)*n%10::4]}"
+
+
+class StudentNotFound(Exception):
+    pass
+
+
+class SchoolAdminNotFound(Exception):
+    pass
+
+
+class ResultsNotFound(Exception):
+    pass
+
+
+class ReportCardBuilder:
+    """
+    Assemble a student's report card for one term, shared by the admin and
+    parent result views. build() runs at most five queries whatever the
+    number of subjects or the size of the class.
+    """
+
+    def __init__(self, school, session, term):
+        self.school = school
+        self.session = session
+        self.term = term
+
+    def _get_student(self, student_id):
+        enrollment = StudentEnrollment.objects.filter(
+            student=OuterRef('pk'),
+            school=self.school,
+            session=self.session,
+        )
+        return Student.objects.filter(id=student_id).annotate(
+            class_level_id=Subquery(enrollment.values('class_level')[:1]),
+            class_name=Subquery(enrollment.values('class_level__name')[:1]),
+        ).first()
+
+    def _get_admin_user(self):
+        return self.school.user.filter(is_admin=True).first()
+
+    def get(self, student_id):
+        """
+        Return the report card from the cache when the class-term version is
+        unchanged, building and caching it otherwise.
+        """
+        key = report_card_cache_key(self.school.id, student_id, self.term.id, self.session.id)
+        if key is not None:
+            entry = cache.get(key)
+            if entry is not None and entry['school_id'] == self.school.id:
+                return entry['report_card']
+
+        report_card = self.build(student_id)
+        entry = {
+            'school_id': self.school.id,
+            'show': self.session.show,
+            'report_card': report_card,
+        }
+        cache_report_card(
+            self.school.id, self._class_level_id, student_id, self.term.id, self.session.id, entry, key=key
+        )
+        return report_card
+
+    def build(self, student_id):
+        student = self._get_student(student_id)
+        if not student:
+            raise StudentNotFound()
+        self._class_level_id = student.class_level_id
+
+        admin_user = self._get_admin_user()
+        if not admin_user:
+            raise SchoolAdminNotFound()
+
+        results = list(Result.objects.filter(student=student, term=self.term, session=self.session))
+        if not results:
+            raise ResultsNotFound()
+        for result in results:
+            # The serializer reads these names; they are already loaded
+            result.student = student
+            result.term = self.term
+            result.session = self.session
+
+        result_summary = TermTotalMark.objects.filter(student=student, term=self.term, session=self.session).first()
+        ranking = get_student_ranking(student.id, self.term.id, self.session.id)
+
+        return self._assemble(student, student.class_name, admin_user, results, result_summary, ranking)
+
+    def build_class(self, class_level):
+        """
+        Build the report card of every student in a class with results this
+        term. The class is ranked once and the query count is the same for
+        any class size. Returns (report_cards, student names without results).
+        """
+        admin_user = self._get_admin_user()
+        if not admin_user:
+            raise SchoolAdminNotFound()
+
+        students = {}
+        for enrollment in StudentEnrollment.objects.filter(
+            class_level=class_level, school=self.school, session=self.session, student__isnull=False
+        ).select_related('student').order_by('student__name'):
+            students.setdefault(enrollment.student_id, enrollment.student)
+
+        results_by_student = {}
+        for result in Result.objects.filter(student_id__in=students, term=self.term, session=self.session):
+            result.student = students[result.student_id]
+            result.term = self.term
+            result.session = self.session
+            results_by_student.setdefault(result.student_id, []).append(result)
+
+        summaries = {
+            summary.student_id: summary
+            for summary in TermTotalMark.objects.filter(student_id__in=students, term=self.term, session=self.session)
+        }
+
+        rankings = {
+            ranking.student_id: ranking
+            for ranking in ClassTermRanking.objects.filter(class_level=class_level, term=self.term, session=self.session)
+        }
+        if set(results_by_student) - set(rankings):
+            rankings = {
+                ranking.student_id: ranking
+                for ranking in refresh_class_ranking(class_level.id, self.term.id, self.session.id)
+            }
+
+        report_cards = []
+        without_results = []
+        for student_id, student in students.items():
+            results = results_by_student.get(student_id)
+            if not results:
+                without_results.append(student.name)
+                continue
+            report_cards.append(self._assemble(
+                student, class_level.name, admin_user, results, summaries.get(student_id), rankings.get(student_id)
+            ))
+        return report_cards, without_results
+
+    def _assemble(self, student, class_name, admin_user, results, result_summary, ranking):
+        total_score = sum(result.total_score or 0 for result in results)
+        subjects_count = len(results)
+        total_possible = subjects_count * 100
+        average_score = round((total_score / total_possible) * 100, 2) if total_possible else 0
+
+        student_position = ranking.position if ranking else 1
+        student_total_count = ranking.class_size if ranking else 0
+        class_avg = round((ranking.class_average / (100 * subjects_count)) * 100, 2) if ranking and subjects_count else 0
+
+        return {
+            "school_info": {
+                "school_name": self.school.school_name,
+                "location": self.school.school_address or "Not Set",
+                "phone": admin_user.phone,
+                "email": admin_user.email
+            },
+            "academic_sessions": {
+                "session": self.session.name,
+                "term": self.term.name,
+                "resumptionDate": self.session.next_term_date
+            },
+            "student": {
+                "student_name": student.name,
+                "other_info": student.other_info,
+                "class": class_name or "not set"
+            },
+            "results": ResultSerializer(results, many=True).data,
+            "performance_summary": {
+                "total_score": total_score,
+                "out_of": total_possible,
+                "average_score": f"{average_score}%",
+                "class_average": f"{class_avg}%",
+                "position": ordinal(student_position),
+                "out_of_students": student_total_count
+            },
+            "comments": {
+                "principal_comment": result_summary.principal_comment if result_summary and result_summary.principal_comment else "Not Set",
+                "teacher_comment": result_summary.teacher_comment if result_summary and result_summary.teacher_comment else "Not Set",
+            }
+        }
+
+
+def build_annual_report(school, session, student_id):
+    """
+    A student's cumulative result for the session: every subject's term
+    totals and average, with the overall average and annual class position.
+    """
+    student = Student.objects.filter(id=student_id, school=school).first()
+    if not student:
+        raise StudentNotFound()
+
+    annual, subject_results = get_student_annual(student.id, session.id)
+    if annual is None:
+        raise ResultsNotFound()
+
+    return {
+        "student": {
+            "student_name": student.name,
+            "other_info": student.other_info,
+            "class": annual.class_level.name
+        },
+        "session": session.name,
+        "terms": list(session.terms.order_by('created_at', 'id').values_list('name', flat=True)),
+        "results": AnnualSubjectResultSerializer(subject_results, many=True).data,
+        "performance_summary": {
+            "total_score": annual.total,
+            "average_score": f"{annual.average}%",
+            "class_average": f"{annual.class_average}%",
+            "grade": annual.grade,
+            "remark": annual.remark,
+            "position": ordinal(annual.position),
+            "out_of_students": annual.class_size
+        }
+    }
@@ -0,0 +1,156 @@
+from django.db import transaction
+
+from .grading import get_grading_index
+from .models import Result, TermTotalMark
+from .query_counter import QueryCounter
+from .rankings import refresh_rankings_for_students
+
+
+SCORE_FIELDS = ('ca1', 'ca2', 'ca3', 'exam')
+RESULT_UPDATE_FIELDS = ['first_test', 'second_test', 'third_test', 'c_a', 'exam', 'total_score', 'grade', 'remark']
+TERM_TOTAL_UPDATE_FIELDS = ['total_ca', 'total_exam', 'total_score', 'grade', 'remarks']
+BATCH_SIZE = 500
+
+
+def clean_result_rows(rows):
+    """
+    Validate uploaded result rows in memory, the same way Result.full_clean() would.
+    Returns (valid_rows, errors). A subject listed twice keeps its last row.
+    """
+    max_subject_length = Result._meta.get_field('subjects').max_length
+    cleaned = {}
+    errors = []
+
+    for idx, item in enumerate(rows):
+        subject = str(item.get('subject') or '').strip().capitalize()
+        if not subject:
+            errors.append({'row': idx, 'reason': 'Missing subject name'})
+            continue
+        if len(subject) > max_subject_length:
+            errors.append({'row': idx, 'reason': f'Subject name cannot exceed {max_subject_length} characters'})
+            continue
+
+        scores = {}
+        for field in SCORE_FIELDS:
+            value = item.get(field)
+            if value is None or value == '':
+                scores[field] = None
+                continue
+            try:
+                value = int(value)
+            except (ValueError, TypeError):
+                break
+            if value < 0:
+                break
+            scores[field] = value
+        if len(scores) != len(SCORE_FIELDS):
+            errors.append({'row': idx, 'reason': f'One or more scores invalid for {subject}'})
+            continue
+
+        total = (scores['ca1'] or 0) + (scores['ca2'] or 0) + (scores['ca3'] or 0) + (scores['exam'] or 0)
+        if total > 100:
+            errors.append({'row': idx, 'reason': f'C.A + Exam score cannot exceed 100 for {subject}. Current total is {total}.'})
+            continue
+
+        cleaned[subject] = {'subject': subject, **scores}
+
+    return list(cleaned.values()), errors
+
+
+def ingest_results(school, session, term, rows_by_student, comments=None):
+    """
+    Save already cleaned rows for one or more students with bulk writes in one
+    transaction, then recompute every touched TermTotalMark exactly once.
+
+    rows_by_student maps student_id -> rows from clean_result_rows().
+    comments optionally maps student_id -> {'teacher_comment', 'principal_comment'}.
+    """
+    comments = comments or {}
+    student_ids = list(rows_by_student)
+
+    with QueryCounter() as counter:
+        with transaction.atomic():
+            grading_index = get_grading_index(school.id)
+
+            results = {}
+            for result in Result.objects.filter(student_id__in=student_ids, term=term, session=session):
+                results[(result.student_id, result.subjects)] = result
+
+            to_create = []
+            to_update = []
+            for student_id, rows in rows_by_student.items():
+                for row in rows:
+                    result = results.get((student_id, row['subject']))
+                    if result is None:
+                        result = Result(student_id=student_id, term=term, session=session, subjects=row['subject'])
+                        results[(student_id, row['subject'])] = result
+                        to_create.append(result)
+                    else:
+                        to_update.append(result)
+
+                    result.first_test = row['ca1']
+                    result.second_test = row['ca2']
+                    result.third_test = row['ca3']
+                    result.exam = row['exam']
+                    result.c_a = (result.first_test or 0) + (result.second_test or 0) + (result.third_test or 0)
+                    result.total_score = result.c_a + (result.exam or 0)
+                    grading = grading_index.resolve(result.total_score)
+                    result.grade = grading[0] if grading else 'N/A'
+                    result.remark = grading[1] if grading else 'N/A'
+
+            Result.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            Result.objects.bulk_update(to_update, RESULT_UPDATE_FIELDS, batch_size=BATCH_SIZE)
+
+            # Every result of these students for the term is already in memory,
+            # so the term totals need no aggregate query.
+            sums = {student_id: [0, 0, 0] for student_id in student_ids}
+            for (student_id, _), result in results.items():
+                sums[student_id][0] += result.c_a or 0
+                sums[student_id][1] += result.exam or 0
+                sums[student_id][2] += result.total_score or 0
+
+            term_totals = {
+                mark.student_id: mark
+                for mark in TermTotalMark.objects.filter(student_id__in=student_ids, term=term, session=session)
+            }
+            totals_to_create = []
+            totals_to_update = []
+            for student_id, (total_ca, total_exam, total_score) in sums.items():
+                mark = term_totals.get(student_id)
+                if mark is None:
+                    mark = TermTotalMark(student_id=student_id, term=term, session=session)
+                    totals_to_create.append(mark)
+                else:
+                    totals_to_update.append(mark)
+
+                term_grading = grading_index.resolve(total_score)
+                mark.total_ca = total_ca
+                mark.total_exam = total_exam
+                mark.total_score = total_score
+                mark.grade = term_grading[0] if term_grading else 'N/A'
+                mark.remarks = term_grading[1] if term_grading else ''
+                if student_id in comments:
+                    mark.teacher_comment = comments[student_id].get('teacher_comment')
+                    mark.principal_comment = comments[student_id].get('principal_comment')
+
+            update_fields = TERM_TOTAL_UPDATE_FIELDS
+            if comments:
+                update_fields = TERM_TOTAL_UPDATE_FIELDS + ['teacher_comment', 'principal_comment']
+            TermTotalMark.objects.bulk_create(totals_to_create, batch_size=BATCH_SIZE)
+            TermTotalMark.objects.bulk_update(totals_to_update, update_fields, batch_size=BATCH_SIZE)
+
+            # bulk writes skip the TermTotalMark signals, so refresh the classes here
+            refresh_rankings_for_students(student_ids, term.id, session.id)
+
+    return {
+        'students': len(student_ids),
+        'created': len(to_create),
+        'updated': len(to_update),
+        'query_count': counter.count,
+        'elapsed_seconds': counter.elapsed,
+    }
+
+
+def ingest_student_results(school, session, term, student, rows, teacher_comment=None, principal_comment=None):
+    comments = {student.id: {'teacher_comment': teacher_comment, 'principal_comment': principal_comment}}
+    return ingest_results(school, session, term, {student.id: rows}, comments=comments)
@@ -1,11 +1,22 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.db import transaction
+from django.utils.text import get_valid_filename
 import openpyxl
 
 from administrator.serializers import ResultSerializer, TermTotalMarkSerializer
-from .models import AcademicSession, Result, Student, StudentEnrollment, Subject, SchoolProfile, Term, TermTotalMark
+from .models import AcademicSession, AnnualResult, ClassLevel, Result, Student, StudentEnrollment, Subject, SchoolProfile, Term, TermTotalMark
+from .printouts import PrintoutUnavailable, build_printout_zip, printout_filename, render_pdfs
+from .annual_results import refresh_class_annual
+from .broadsheets import Broadsheet
+from .class_workbooks import get_class_students, write_class_template
+from .report_cards import ReportCardBuilder, ResultsNotFound, build_annual_report, SchoolAdminNotFound, StudentNotFound
+from .result_ingest import clean_result_rows, ingest_results, ingest_student_results
+from .upload_jobs import get_upload_job, job_response, start_upload_job
+from .upload_parsers import parse_class_result_sheet, parse_student_result_sheet
+from .upload_staging import StagedUploadInProgress, StagedUploadNotFound, confirm_staged_upload, stage_results
 from rest_framework.parsers import MultiPartParser, FormParser
 from drf_yasg.utils import swagger_auto_schema
 class SubjectExcelExportView(APIView):
@@ -17,15 +28,15 @@ class SubjectExcelExportView(APIView):
         except Student.DoesNotExist:
             return Response({"error": "Invalid student"}, status=404)
         
-        school = SchoolProfile.objects.filter(user=request.user).first()
+        school = request.tenant.school
         if not school:
             return Response({"error": "School profile not found."}, status=404)
         
-        session = AcademicSession.objects.filter(school = school, is_current=True).first()
+        session = request.tenant.session
         if not session:
             return Response({"error": "session not set"}, status=404)
         
-        term = Term.objects.filter(session=session, is_current=True).first()
+        term = request.tenant.term
         if not term:
             return Response({"error": "term not set"}, status=404)
 
@@ -85,83 +96,44 @@ class UploadStudentResultPreviewView(APIView):
         except Student.DoesNotExist:
             return Response({"error": "Invalid student"}, status=404)
 
-        school = SchoolProfile.objects.filter(user=request.user).first()
+        school = request.tenant.school
         if not school:
             return Response({"error": "School profile not found."}, status=404)
 
-        session = AcademicSession.objects.filter(school=school, is_current=True).first()
+        session = request.tenant.session
         if not session:
             return Response({"error": "Session not set"}, status=404)
 
-        term = Term.objects.filter(session=session, is_current=True).first()
+        term = request.tenant.term
         if not term:
             return Response({"error": "Term not set"}, status=404)
 
-        wb = openpyxl.load_workbook(excel_file)
-        ws = wb.active
-
-        headers = [cell.value for cell in ws[1]]
-        expected_headers = ['Subject', 'CA1', 'CA2', 'CA3', 'Exam']
-        if headers != expected_headers:
-            return Response({'detail': 'Invalid file format. Expected headers: ' + ', '.join(expected_headers)}, status=400)
-
         db_subjects = set(
             Subject.objects.filter(school=school).values_list('name', flat=True)
         )
 
+        def finish(outcome):
+            if 'invalid_headers' in outcome:
+                return 400, {'detail': 'Invalid file format. Expected headers: ' + ', '.join(outcome['invalid_headers'])}
+
+            # Stage the normalized rows so confirm only has to send the token back
+            cleaned_rows = outcome['valid_rows']
+            upload_token = stage_results(school, session, term, {student.id: cleaned_rows}, student_id=student.id) if cleaned_rows else None
+            return 200, {
+                "session": f"{session.name} | {term.name}",
+                "student": student.name,
+                "student_id": student.id,
+                'detail': 'Preview of uploaded results',
+                'upload_token': upload_token,
+                'valid_rows': cleaned_rows,
+                'skipped_rows': outcome['skipped_rows'],
+                'parse_stats': outcome['parse_stats']
+            }
 
-        valid_rows = []
-        skipped_rows = []
-        uploaded_subjects = set()
-
-        def is_valid_score(value):
-            try:
-                if value is None:
-                    return False
-                int(value)
-                return True
-            except (ValueError, TypeError):
-                return False
-
-        for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            subject_name = str(row[0]).strip() if row[0] else None
-            ca1, ca2, ca3, exam = row[1], row[2], row[3], row[4]
-
-            # Check subject name present and valid
-            if not subject_name or subject_name not in db_subjects:
-                skipped_rows.append({'row': idx, 'reason': 'Invalid or missing subject name', 'data': row})
-                continue
-
-            # Check all scores are valid (not None and intable)
-            if not all(is_valid_score(score) for score in (ca1, ca2, ca3, exam)):
-                skipped_rows.append({'row': idx, 'reason': 'One or more scores missing or invalid', 'data': row})
-                continue
-
-            uploaded_subjects.add(subject_name)
-            valid_rows.append({
-                'subject': subject_name,
-                'ca1': int(ca1),
-                'ca2': int(ca2),
-                'ca3': int(ca3),
-                'exam': int(exam)
-            })
-
-        invalid_subjects = list(uploaded_subjects - db_subjects)
-        if invalid_subjects:
-            return Response({
-                'detail': 'Some subjects are invalid or do not match exactly with the database.',
-                'invalid_subjects': invalid_subjects,
-                'skipped_rows': skipped_rows
-            }, status=400)
-
-        return Response({
-            "session": f"{session.name} | {term.name}",
-            "student": student.name,
-            "student_id": student.id,
-            'detail': 'Preview of uploaded results',
-            'valid_rows': valid_rows,
-            'skipped_rows': skipped_rows
-        }, status=200)
+        job, error = start_upload_job(excel_file, parse_student_result_sheet, (db_subjects,), finish, school.id)
+        if error:
+            return error
+        return job_response(request, job)
 
 
 
@@ -173,6 +145,10 @@ class ConfirmUploadStudentResultView(APIView):
         student_id = request.data.get('student_id')
         teacher_comment = request.data.get("teacher_comment")
         principal_comment = request.data.get("principal_comment")
+        upload_token = request.data.get('upload_token')
+        
+        if upload_token:
+            return self.confirm_staged(request, upload_token, teacher_comment, principal_comment)
         
         if not data:
             return Response({'detail': 'No results provided'}, status=400)
@@ -182,41 +158,133 @@ class ConfirmUploadStudentResultView(APIView):
         except Student.DoesNotExist:
             return Response({"error": "Invalid student"}, status=404)
 
-        school = SchoolProfile.objects.filter(user=request.user).first()
+        school = request.tenant.school
         if not school:
             return Response({"error": "School profile not found."}, status=404)
 
-        session = AcademicSession.objects.filter(school=school, is_current=True).first()
+        session = request.tenant.session
         if not session:
             return Response({"error": "Session not set"}, status=404)
 
-        term = Term.objects.filter(session=session, is_current=True).first()
+        term = request.tenant.term
         if not term:
             return Response({"error": "Term not set"}, status=404)
 
-        for item in data:
-            Result.objects.update_or_create(
-                student=student,
-                term=term,
-                session=session,
-                subjects=item['subject'],
-                defaults={
-                    'first_test': item.get('ca1'),
-                    'second_test': item.get('ca2'),
-                    'third_test': item.get('ca3'),
-                    'exam': item.get('exam')
-                }
+        if request.data.get('mode') == 'bulk':
+            rows, errors = clean_result_rows(data)
+            if errors:
+                return Response({'detail': 'Some result rows are invalid.', 'errors': errors}, status=400)
+
+            summary = ingest_student_results(
+                school, session, term, student, rows,
+                teacher_comment=teacher_comment,
+                principal_comment=principal_comment,
             )
+            return Response({'detail': '✅ Results saved successfully.', **summary}, status=201)
+
+        # One transaction, so the class ranking is rebuilt once on commit rather than per subject
+        with transaction.atomic():
+            for item in data:
+                Result.objects.update_or_create(
+                    student=student,
+                    term=term,
+                    session=session,
+                    subjects=item['subject'],
+                    defaults={
+                        'first_test': item.get('ca1'),
+                        'second_test': item.get('ca2'),
+                        'third_test': item.get('ca3'),
+                        'exam': item.get('exam')
+                    }
+                )
             
-        resultSummary = TermTotalMark.objects.filter(student=student, term=term, session=session).first()
-        if resultSummary:
-            resultSummary.principal_comment = principal_comment
-            resultSummary.teacher_comment = teacher_comment
-            resultSummary.save()
+            resultSummary = TermTotalMark.objects.filter(student=student, term=term, session=session).first()
+            if resultSummary:
+                resultSummary.principal_comment = principal_comment
+                resultSummary.teacher_comment = teacher_comment
+                resultSummary.save()
             
 
         return Response({'detail': '✅ Results saved successfully.'}, status=201)
+    
+    def confirm_staged(self, request, upload_token, teacher_comment, principal_comment):
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
+
+        try:
+            summary, created = confirm_staged_upload(
+                upload_token, school,
+                teacher_comment=teacher_comment,
+                principal_comment=principal_comment,
+            )
+        except StagedUploadNotFound:
+            return Response({'detail': 'Upload token is invalid or has expired. Preview the file again.'}, status=404)
+        except StagedUploadInProgress:
+            return Response({'detail': 'This upload is already being saved.'}, status=409)
+
+        return Response({'detail': '✅ Results saved successfully.', **summary}, status=201 if created else 200)
+
+
+
 
+class ClassResultTemplateView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def get(self, request, class_level_id):
+        school, class_level, session, term, error = get_class_period(request, class_level_id, request.query_params)
+        if error:
+            return error
+        
+        filename = get_valid_filename(f"{class_level.name}_{term.name}_result_template.xlsx")
+        return FileResponse(
+            write_class_template(school, class_level, session, term), as_attachment=True, filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+
+
+class UploadClassResultView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    @swagger_auto_schema(tags=["Result"])
+    def post(self, request, class_level_id):
+        excel_file = request.FILES.get('file')
+        if not excel_file:
+            return Response({'detail': 'Missing required field or file'}, status=400)
+        
+        school, class_level, session, term, error = get_class_period(request, class_level_id, request.data)
+        if error:
+            return error
+        
+        students = get_class_students(class_level, session)
+        subjects = set(Subject.objects.filter(school=school).values_list('name', flat=True))
+        
+        preview = str(request.data.get('preview', '')).lower() in ('1', 'true')
+        
+        def finish(outcome):
+            if outcome['errors']:
+                return 400, {'detail': 'Some result rows are invalid.', 'errors': outcome['errors']}
+            rows_by_student = outcome['rows_by_student']
+            if not rows_by_student:
+                return 400, {'detail': 'No results provided'}
+            upload_token = stage_results(school, session, term, rows_by_student)
+            if not preview:
+                # Saved as soon as the parse finishes; the job status carries the summary
+                summary, _ = confirm_staged_upload(upload_token, school)
+                return 201, {'detail': '✅ Results saved successfully.', **summary, 'parse_stats': outcome['parse_stats']}
+            return 200, {
+                'detail': 'Preview of uploaded results',
+                'upload_token': upload_token,
+                'students': len(rows_by_student),
+                'rows': sum(len(rows) for rows in rows_by_student.values()),
+                'parse_stats': outcome['parse_stats'],
+            }
+        
+        job, error = start_upload_job(excel_file, parse_class_result_sheet, (students, subjects), finish, school.id)
+        if error:
+            return error
+        return job_response(request, job)
 
 
 
@@ -229,15 +297,15 @@ class ResetStudentResultView(APIView):
         except Student.DoesNotExist:
             return Response({"error": "Invalid student"}, status=404)
         
-        school = SchoolProfile.objects.filter(user=request.user).first()
+        school = request.tenant.school
         if not school:
             return Response({"error": "School profile not found."}, status=404)
         
-        session = AcademicSession.objects.filter(school = school, is_current=True).first()
+        session = request.tenant.session
         if not session:
             return Response({"error": "session not set"}, status=404)
         
-        term = Term.objects.filter(session=session, is_current=True).first()
+        term = request.tenant.term
         if not term:
             return Response({"error": "term not set"}, status=404)
         
@@ -246,157 +314,297 @@ class ResetStudentResultView(APIView):
             return Response({"error": "No results found for this student in the current term and session."}, status=404)
 
         results.delete()
+        # Drop the stale term total too, which takes the student out of the class ranking
+        TermTotalMark.objects.filter(student=student, term=term, session=session).delete()
         return Response({'detail': '✅ Results reset successfully.'}, status=200)
     
     
-from django.db.models import Sum, Count, F
-from django.db.models.functions import Coalesce
-
-def ordinal(n):
-    return f"{n}{'tsnrhtdd'[(n//10%10!=1)*(n%10<4)*n%10::4]}"
-
-
 class ShowStudentResultView(APIView):
     permission_classes = [IsAuthenticated]
     @swagger_auto_schema(tags=["Result"])
     def post(self, request, student_id):
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
+        
+        session = request.tenant.session
+        if not session:
+            return Response({"error": "session not set"}, status=404)
+        
+        term = request.tenant.term
+        if not term:
+            return Response({"error": "term not set"}, status=404)
+        
         try:
-            student = Student.objects.get(id=student_id)
-        except Student.DoesNotExist:
+            report_card = ReportCardBuilder(school, session, term).get(student_id)
+        except StudentNotFound:
             return Response({"error": "Invalid student"}, status=404)
+        except SchoolAdminNotFound:
+            return Response({"error": "No admin user found for this school."}, status=404)
+        except ResultsNotFound:
+            return Response({"error": "No results found for this student in the current term and session."}, status=404)
         
-        school = SchoolProfile.objects.filter(user=request.user).first()
-        if not school:
-            return Response({"error": "School profile not found."}, status=404)
+        return Response(report_card)
         
-        admin_user = school.user.filter(is_admin=True).first()
-        if not admin_user:
+        
+
+def get_class_period(request, class_level_id, data):
+    """
+    Resolve the school, class, session and term of a class-level request.
+    session_id/term_id are optional and default to the current ones.
+    Returns (school, class_level, session, term, error_response).
+    """
+    school = request.tenant.school
+    if not school:
+        return None, None, None, None, Response({"error": "School profile not found."}, status=404)
+    
+    class_level = ClassLevel.objects.filter(school=school, id=class_level_id).first()
+    if not class_level:
+        return None, None, None, None, Response({"error": "Invalid class level"}, status=404)
+    
+    session_id = data.get('session_id')
+    if session_id:
+        session = AcademicSession.objects.filter(school=school, id=session_id).first()
+    else:
+        session = request.tenant.session
+    if not session:
+        return None, None, None, None, Response({"error": "session not set"}, status=404)
+    
+    term_id = data.get('term_id')
+    if term_id:
+        term = Term.objects.filter(session=session, id=term_id).first()
+    else:
+        term = request.tenant.term
+    if not term:
+        return None, None, None, None, Response({"error": "term not set"}, status=404)
+    
+    return school, class_level, session, term, None
+
+
+class ShowClassResultsView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def post(self, request, class_level_id):
+        school, class_level, session, term, error = get_class_period(request, class_level_id, request.data)
+        if error:
+            return error
+        
+        try:
+            report_cards, without_results = ReportCardBuilder(school, session, term).build_class(class_level)
+        except SchoolAdminNotFound:
             return Response({"error": "No admin user found for this school."}, status=404)
         
-        session = AcademicSession.objects.filter(school = school, is_current=True).first()
+        return Response({
+            "class": class_level.name,
+            "session": session.name,
+            "term": term.name,
+            "total_report_cards": len(report_cards),
+            "report_cards": report_cards,
+            "students_without_results": without_results,
+        })
+        
+        
+
+class ResultPrintoutView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def get(self, request, student_id):
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
+        
+        session = request.tenant.session
         if not session:
             return Response({"error": "session not set"}, status=404)
         
-        term = Term.objects.filter(session=session, is_current=True).first()
+        term = request.tenant.term
         if not term:
             return Response({"error": "term not set"}, status=404)
         
-        results = Result.objects.filter(student=student, term=term, session=session)
-        if not results.exists():
+        try:
+            report_card = ReportCardBuilder(school, session, term).get(student_id)
+        except StudentNotFound:
+            return Response({"error": "Invalid student"}, status=404)
+        except SchoolAdminNotFound:
+            return Response({"error": "No admin user found for this school."}, status=404)
+        except ResultsNotFound:
             return Response({"error": "No results found for this student in the current term and session."}, status=404)
-        results_serializer = ResultSerializer(results, many=True)
         
-        # Comments
-        resultSummary = TermTotalMark.objects.filter(student=student, term=term, session=session).first()
-        
-        class_name = StudentEnrollment.objects.filter(student=student, school=school, session=session).first()    
-        
-        # Total score for the student
-        total_score = results.aggregate(total=Coalesce(Sum('total_score'), 0))['total']
-        subjects_count = results.count()
-        total_possible = subjects_count * 100
-        average_score = round((total_score / total_possible) * 100, 2) if total_possible else 0
-        
-        class_results = None
-        student_ids_in_class = None
-        # Class-level stats
-        class_enrollment = StudentEnrollment.objects.filter(student=student, school=school, session=session).first()
-        if class_enrollment:
-            student_ids_in_class = StudentEnrollment.objects.filter(
-                class_level=class_enrollment.class_level,
-                session=session,
-                school=school
-            ).values_list('student', flat=True)
-
-            # Get all results for those students in the given session and term
-            class_results = Result.objects.filter(
-                student_id__in=student_ids_in_class,
-                session=session,
-                term=term
-            )
-        else:
-            class_results = Result.objects.none()
+        try:
+            path = render_pdfs([report_card])[0]
+        except PrintoutUnavailable as e:
+            return Response({"error": str(e)}, status=503)
         
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=printout_filename(report_card), content_type='application/pdf')
+    
+    
+
+class ClassResultPrintoutView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def get(self, request, class_level_id):
+        school, class_level, session, term, error = get_class_period(request, class_level_id, request.query_params)
+        if error:
+            return error
         
-        # Compute each student's total
-        student_scores = (
-            class_results.values('student_id')
-            .annotate(total=Coalesce(Sum('total_score'), 0))
-            .order_by('-total')
-        )
+        try:
+            report_cards, _ = ReportCardBuilder(school, session, term).build_class(class_level)
+        except SchoolAdminNotFound:
+            return Response({"error": "No admin user found for this school."}, status=404)
+        if not report_cards:
+            return Response({"error": "No results found for this class in the selected term and session."}, status=404)
+        
+        try:
+            paths = render_pdfs(report_cards)
+        except PrintoutUnavailable as e:
+            return Response({"error": str(e)}, status=503)
+        
+        filename = get_valid_filename(f"{class_level.name}_{session.name}_{term.name}_results.zip")
+        return FileResponse(build_printout_zip(report_cards, paths), as_attachment=True, filename=filename, content_type='application/zip')
         
         
-        # Calculate position
-        student_position = 1
-        for idx, data in enumerate(student_scores, start=1):
-            if data['student_id'] == student.id:
-                student_position = idx
-                break
-            
-        # Class average
-        class_total = class_results.aggregate(class_total=Coalesce(Sum('total_score'), 0))['class_total']
-        total_subjects = class_results.count()
-        student_total_count = student_ids_in_class.count()
-        class_avg = round((class_total / (student_total_count * 100 * subjects_count)) * 100, 2) if student_total_count and subjects_count else 0
 
+class UploadJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def get(self, request, job_id):
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
         
+        job = get_upload_job(job_id, school.id)
+        if not job:
+            return Response({"error": "Upload job not found or has expired."}, status=404)
         
         return Response({
-            "school_info": {
-                "school_name": school.school_name,
-                "location": school.school_address or "Not Set",
-                "phone": admin_user.phone ,
-                "email":  admin_user.email
-            },
-            "academic_sessions" : {
-                "session": session.name,
-                "term": term.name,
-                "resumptionDate": session.next_term_date
-            },
-            "student" : {
-                "student_name" : student.name,
-                "other_info" : student.other_info,
-                "class" : class_name.class_level.name or "not set"
-            },
-            "results" : results_serializer.data,
-            "performance_summary": {
-                "total_score": total_score,
-                "out_of": total_possible,
-                "average_score": f"{average_score}%",
-                "class_average": f"{class_avg}%",
-                "position": ordinal(student_position),
-                "out_of_students": student_total_count
-            },
-            "comments":{
-                "principal_comment": resultSummary.principal_comment if resultSummary and resultSummary.principal_comment else "Not Set",
-                "teacher_comment": resultSummary.teacher_comment if resultSummary and resultSummary.teacher_comment else "Not Set",
-
-            }
+            'job_id': job['id'],
+            'status': job['status'],
+            'rows': job['rows'],
+            'response_status': job['response_status'],
+            'response': job['response'],
         })
+    
+    
+
+class ClassBroadsheetView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def get(self, request, class_level_id):
+        school, class_level, session, term, error = get_class_period(request, class_level_id, request.query_params)
+        if error:
+            return error
+        
+        export = request.query_params.get('export')
+        if export not in (None, 'xlsx', 'csv'):
+            return Response({"error": "Invalid export type. Expected xlsx or csv."}, status=400)
+        
+        broadsheet = Broadsheet(class_level, session, term, policy=school.ranking_policy)
+        filename = get_valid_filename(f"{class_level.name}_{session.name}_{term.name}_broadsheet")
         
+        if export == 'xlsx':
+            return FileResponse(
+                broadsheet.to_xlsx(), as_attachment=True, filename=f"{filename}.xlsx",
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
         
+        if export == 'csv':
+            response = StreamingHttpResponse(broadsheet.iter_csv(), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
         
+        return Response(broadsheet.to_dict())
+    
+    
 
-class ResultListAPIView(APIView):
+class ShowStudentAnnualResultView(APIView):
     permission_classes = [IsAuthenticated]
     @swagger_auto_schema(tags=["Result"])
     def get(self, request, student_id):
-        user = request.user
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
+        
+        session_id = request.query_params.get('session_id')
+        if session_id:
+            session = AcademicSession.objects.filter(school=school, id=session_id).first()
+        else:
+            session = request.tenant.session
+        if not session:
+            return Response({"error": "session not set"}, status=404)
         
+        try:
+            annual_report = build_annual_report(school, session, student_id)
+        except StudentNotFound:
+            return Response({"error": "Invalid student"}, status=404)
+        except ResultsNotFound:
+            return Response({"error": "No results found for this student in the selected session."}, status=404)
+        
+        return Response(annual_report)
+    
+    
+
+class ShowClassAnnualResultsView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def get(self, request, class_level_id):
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
+        
+        class_level = ClassLevel.objects.filter(school=school, id=class_level_id).first()
+        if not class_level:
+            return Response({"error": "Invalid class level"}, status=404)
+        
+        session_id = request.query_params.get('session_id')
+        if session_id:
+            session = AcademicSession.objects.filter(school=school, id=session_id).first()
+        else:
+            session = request.tenant.session
+        if not session:
+            return Response({"error": "session not set"}, status=404)
+        
+        annual_results = AnnualResult.objects.filter(class_level=class_level, session=session).select_related('student')
+        if not annual_results.exists():
+            refresh_class_annual(class_level.id, session.id, policy=school.ranking_policy)
+        
+        return Response({
+            "class": class_level.name,
+            "session": session.name,
+            "results": [
+                {
+                    "student_id": annual.student_id,
+                    "student_name": annual.student.name,
+                    "total_score": annual.total,
+                    "average_score": annual.average,
+                    "grade": annual.grade,
+                    "position": annual.position,
+                }
+                for annual in annual_results
+            ],
+            "class_average": annual_results[0].class_average if annual_results else 0,
+            "out_of_students": annual_results[0].class_size if annual_results else 0,
+        })
+        
+        
+
+class ResultListAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Result"])
+    def get(self, request, student_id):
         try:
             student = Student.objects.get(id=student_id)
         except Student.DoesNotExist:
             return Response({"error": "Invalid student"}, status=404)
         
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         if not school:
             return Response({"error": "School profile not found."}, status=404)
 
-        session = AcademicSession.objects.filter(school=school, is_current=True).first()
+        session = request.tenant.session
         if not session:
             return Response({"error": "Session not set"}, status=404)
 
-        term = Term.objects.filter(session=session, is_current=True).first()
+        term = request.tenant.term
         if not term:
             return Response({"error": "Term not set"}, status=404)
         
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from administrator.models import AcademicSession, ClassLevel, GradingSystem, Levy, Result, SchoolProfile, Student, StudentEnrollment, Subject, Subscription, Term, TermTotalMark
+from administrator.models import AcademicSession, AnnualSubjectResult, ClassLevel, GradingSystem, Levy, Result, SchoolProfile, Student, StudentEnrollment, Subject, Subscription, Term, TermTotalMark
 from authentication.models import User
 
 
@@ -35,7 +35,7 @@ class ClassLevelSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ClassLevel
-        fields = ['id', 'name', 'school_name']
+        fields = ['id', 'name', 'order', 'school_name']
 
 class StudentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -79,6 +79,16 @@ class TermTotalMarkSerializer(serializers.ModelSerializer):
         ]
         
 
+class AnnualSubjectResultSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = AnnualSubjectResult
+        fields = [
+            'subjects', 'term_totals', 'total',
+            'terms_count', 'average', 'grade', 'remark'
+        ]
+
+
 class SubjectsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subject
@@ -100,7 +110,7 @@ class MainInfoSerializer(serializers.Serializer):
 class SchoolProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = SchoolProfile
-        fields = ['id', 'school_name','school_address']
+        fields = ['id', 'school_name','school_address', 'ranking_policy']
         
         
 class UserSerializer(serializers.ModelSerializer):
@@ -139,4 +149,5 @@ class ParentAcademicSessionSerializer(serializers.ModelSerializer):
 class LeviesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Levy
-        fields = ['id', 'name']
\ No newline at end of file
+        fields = ['id', 'name', 'amount', 'session', 'term']
+        read_only_fields = ['session', 'term']
\ No newline at end of file
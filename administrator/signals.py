@@ -1,78 +1,173 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
 from django.dispatch import receiver
-from django.db import transaction
-from .models import AcademicSession, Levy, StudentEnrollment, ClassLevel, StudentTermTotalFee
+from .grading import invalidate_grading_index
+from .jobs import enqueue
+from authentication.models import User
+from authentication.tokens import bump_token_versions
+from .models import AcademicSession, GradingSystem, Levy, Parent, SchoolProfile, Student, StudentEnrollment, Term, TermTotalMark
+from .parent_cache import forget_parent
+from .parent_tokens import revoke_parent_tokens
+from .rankings import forget_ranking_misses, schedule_ranking_refresh
+from .report_card_cache import bump_school_report_cards, bump_student_report_cards, forget_student_class
+from .tenancy import forget_current_period, forget_school, forget_user_school
 
 
-# add to background
 @receiver(post_save, sender=AcademicSession)
 def promote_students_on_new_session(sender, instance, created, **kwargs):
     if not created:
         return  # Only act on new session creation
 
-    school = instance.school
-    if not school:
+    if not instance.school_id:
         return
 
     # If this is the first session for the school, skip promotion
-    if not AcademicSession.objects.filter(school=school).exclude(id=instance.id).exists():
+    if not AcademicSession.objects.filter(school_id=instance.school_id).exclude(id=instance.id).exists():
         return
 
-    previous_session = (
-        AcademicSession.objects.filter(school=school)
-        .exclude(id=instance.id)
-        .order_by('-created_at')
-        .first()
-    )
+    enqueue('promote_students', school_id=instance.school_id, session_id=instance.id)
 
-    if not previous_session:
-        return
 
-    # Fetch all class levels ordered by creation (or by custom order field if you have)
-    class_levels = list(ClassLevel.objects.filter(school=school).order_by("id"))
-    level_map = {level.id: idx for idx, level in enumerate(class_levels)}
-
-    previous_enrollments = StudentEnrollment.objects.filter(school=school, session=previous_session)
-
-    @transaction.atomic
-    def promote():
-        for enrollment in previous_enrollments:
-            current_level = enrollment.class_level
-            if current_level and current_level.id in level_map:
-                current_index = level_map[current_level.id]
-                try:
-                    next_level = class_levels[current_index + 1]
-                    StudentEnrollment.objects.create(
-                        student=enrollment.student,
-                        class_level=next_level,
-                        school=school,
-                        session=instance
-                    )
-                except IndexError:
-                    # No next level (e.g., final class), skip promotion
-                    continue
-
-    promote()
-
-
-# add to background
 @receiver(post_save, sender=Levy)
 def create_students_levies_on_new_Levies(sender, instance, created, **kwargs):
     if not created:
         return
-    
-    school = instance.school
-    if not school:
+
+    if not instance.school_id or not instance.session_id or not instance.term_id:
+        return
+
+    enqueue('assign_levy', school_id=instance.school_id, levy_id=instance.id)
+
+
+
+@receiver(post_save, sender=GradingSystem)
+@receiver(post_delete, sender=GradingSystem)
+def invalidate_grading_on_change(sender, instance, **kwargs):
+    if instance.school_id:
+        invalidate_grading_index(instance.school_id)
+        bump_school_report_cards(instance.school_id)
+
+
+@receiver(post_init, sender=TermTotalMark)
+def remember_ranked_total(sender, instance, **kwargs):
+    # None when the field was deferred, which counts as changed
+    instance._ranked_total = instance.__dict__.get('total_score')
+
+
+@receiver(post_save, sender=TermTotalMark)
+def refresh_ranking_on_term_total_change(sender, instance, created, **kwargs):
+    if not (instance.student_id and instance.term_id and instance.session_id):
+        return
+    if created or instance.total_score != instance._ranked_total:
+        schedule_ranking_refresh([instance.student_id], instance.term_id, instance.session_id)
+    else:
+        # Only comments changed: positions stand, the student's card doesn't
+        bump_student_report_cards(instance.student_id, instance.term_id, instance.session_id)
+    instance._ranked_total = instance.total_score
+
+
+@receiver(post_delete, sender=TermTotalMark)
+def refresh_ranking_on_term_total_delete(sender, instance, **kwargs):
+    if instance.student_id and instance.term_id and instance.session_id:
+        schedule_ranking_refresh([instance.student_id], instance.term_id, instance.session_id)
+
+
+@receiver(post_save, sender=SchoolProfile)
+@receiver(post_delete, sender=SchoolProfile)
+def invalidate_tenant_school(sender, instance, **kwargs):
+    forget_school(instance.id)
+
+
+@receiver(post_save, sender=AcademicSession)
+@receiver(post_delete, sender=AcademicSession)
+def invalidate_current_period_on_session_change(sender, instance, **kwargs):
+    if instance.school_id:
+        forget_current_period(instance.school_id)
+
+
+@receiver(post_save, sender=Term)
+@receiver(post_delete, sender=Term)
+def invalidate_current_period_on_term_change(sender, instance, **kwargs):
+    if instance.session_id:
+        school_id = AcademicSession.objects.filter(id=instance.session_id).values_list('school_id', flat=True).first()
+        if school_id:
+            forget_current_period(school_id)
+
+
+@receiver(m2m_changed, sender=SchoolProfile.user.through)
+def invalidate_tenant_users(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance is the user
+        user_ids = [instance.pk]
+    elif action == 'pre_clear':
+        user_ids = list(instance.user.values_list('id', flat=True))
+    else:
+        user_ids = list(pk_set)
+    forget_user_school(*user_ids)
+    if action != 'post_add':
+        # Their tokens still carry the school; joining one needs no revocation (see get_user_school)
+        bump_token_versions(*user_ids)
+
+
+@receiver(post_save, sender=Parent)
+@receiver(post_delete, sender=Parent)
+def invalidate_parent_snapshot(sender, instance, **kwargs):
+    # Covers regenerate_access_code, deactivation and password changes
+    forget_parent(instance.id)
+    revoke_parent_tokens(instance.id)
+
+
+@receiver(m2m_changed, sender=Parent.student.through)
+def invalidate_parent_snapshot_on_students_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        # instance is the parent
+        parent_ids = [instance.id]
+    elif action == 'pre_clear':
+        parent_ids = list(instance.parent_set.values_list('id', flat=True))
+    else:
+        parent_ids = list(pk_set)
+    # Signed tokens carry the student ids, so they are reissued at next login
+    forget_parent(*parent_ids)
+    revoke_parent_tokens(*parent_ids)
+
+
+# Report cards also show school, session, student and admin contact details
+@receiver(post_save, sender=SchoolProfile)
+def invalidate_report_cards_on_school_change(sender, instance, **kwargs):
+    bump_school_report_cards(instance.id)
+
+
+@receiver(post_save, sender=AcademicSession)
+@receiver(post_save, sender=Student)
+def invalidate_report_cards_on_school_data_change(sender, instance, **kwargs):
+    if instance.school_id:
+        bump_school_report_cards(instance.school_id)
+
+
+@receiver(post_save, sender=Term)
+def invalidate_report_cards_on_term_change(sender, instance, **kwargs):
+    if instance.session_id:
+        school_id = AcademicSession.objects.filter(id=instance.session_id).values_list('school_id', flat=True).first()
+        if school_id:
+            bump_school_report_cards(school_id)
+
+
+@receiver(post_save, sender=StudentEnrollment)
+@receiver(post_delete, sender=StudentEnrollment)
+def invalidate_report_cards_on_enrollment_change(sender, instance, **kwargs):
+    if instance.student_id:
+        forget_student_class(instance.student_id, instance.session_id)
+        forget_ranking_misses([instance.student_id], instance.session_id)
+    if instance.school_id:
+        bump_school_report_cards(instance.school_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_report_cards_on_admin_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or not instance.is_admin or update_fields == frozenset(['last_login']):
         return
-    
-    enrollments = StudentEnrollment.objects.filter(school=school)
-    @transaction.atomic
-    def createLevies():
-        for enrollment in enrollments:
-            StudentTermTotalFee.objects.create(
-                student = enrollment.student,
-                term = term,
-                session = session, 
-                levy = levy,
-                
-            )
\ No newline at end of file
+    for school_id in SchoolProfile.objects.filter(user=instance).values_list('id', flat=True):
+        bump_school_report_cards(school_id)
@@ -0,0 +1,143 @@
+import threading
+import time
+import tracemalloc
+import zipfile
+
+import openpyxl
+from django.conf import settings
+from openpyxl.utils.exceptions import InvalidFileException
+
+
+PROGRESS_EVERY = 500
+
+
+class InvalidSpreadsheet(Exception):
+    pass
+
+
+class SpreadsheetTooLarge(Exception):
+    pass
+
+
+# tracemalloc is process-wide, so concurrent parses share one tracing window
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_owns_tracing = False
+
+
+def _start_tracing():
+    global _tracing_users, _owns_tracing
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _owns_tracing = not tracemalloc.is_tracing()
+            if _owns_tracing:
+                tracemalloc.start()
+        _tracing_users += 1
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_tracing(baseline):
+    global _tracing_users
+    with _tracing_lock:
+        peak = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+        _tracing_users -= 1
+        if _tracing_users == 0 and _owns_tracing:
+            tracemalloc.stop()
+        return peak
+
+
+class SpreadsheetReader:
+    """
+    Read an uploaded .xlsx file in openpyxl's read-only mode, yielding rows
+    lazily. Files over UPLOAD_MAX_BYTES or UPLOAD_MAX_ROWS are rejected
+    before or while parsing, without being loaded whole, and columns past
+    UPLOAD_MAX_COLUMNS are not read.
+
+        with SpreadsheetReader(file) as sheet:
+            for row_number, values in sheet.rows():
+                ...
+        sheet.stats  # rows read, parse time and peak memory
+
+    progress, when given, is called with the number of rows read so far
+    every PROGRESS_EVERY rows.
+    """
+
+    def __init__(self, file, max_rows=None, max_columns=None, max_bytes=None, progress=None):
+        self.file = file
+        self.progress = progress
+        self.max_rows = max_rows or settings.UPLOAD_MAX_ROWS
+        self.max_columns = max_columns or settings.UPLOAD_MAX_COLUMNS
+        self.max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+        self.headers = []
+        self.stats = {}
+        self._workbook = None
+        self._rows = None
+        self._rows_read = 0
+
+    def __enter__(self):
+        size = getattr(self.file, 'size', None)
+        if size is not None and size > self.max_bytes:
+            raise SpreadsheetTooLarge(f'File is larger than {self.max_bytes / (1024 * 1024):.1f} MB.')
+
+        self._started = time.perf_counter()
+        self._baseline = _start_tracing()
+        try:
+            self._open()
+        except BaseException:
+            self._close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._close()
+        return False
+
+    def _open(self):
+        try:
+            self._workbook = openpyxl.load_workbook(self.file, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError) as exc:
+            raise InvalidSpreadsheet('Invalid file format. Expected an .xlsx workbook.') from exc
+
+        ws = self._workbook.active
+        # The declared dimensions are free to read and catch most oversized sheets up front
+        if ws.max_row and ws.max_row - 1 > self.max_rows:
+            raise SpreadsheetTooLarge(f'File has more than {self.max_rows} rows.')
+
+        # Cells past the column cap are never materialized
+        self._rows = ws.iter_rows(values_only=True, max_col=self.max_columns)
+        self.headers = [
+            str(value).strip() if value is not None else None
+            for value in next(self._rows, ())
+        ]
+
+    def _close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+        if 'parse_seconds' not in self.stats:
+            self.stats = {
+                'rows': self._rows_read,
+                'parse_seconds': round(time.perf_counter() - self._started, 4),
+                'peak_memory_bytes': _stop_tracing(self._baseline),
+            }
+
+    def rows(self):
+        """Yield (row_number, values) for each data row, padded to the header width; blank rows are skipped."""
+        width = len(self.headers)
+        for row_number, values in enumerate(self._rows, start=2):
+            if all(value is None or value == '' for value in values):
+                continue
+            self._rows_read += 1
+            if self._rows_read > self.max_rows:
+                raise SpreadsheetTooLarge(f'File has more than {self.max_rows} rows.')
+            if self.progress and self._rows_read % PROGRESS_EVERY == 0:
+                self.progress(self._rows_read)
+            yield row_number, tuple(values) + (None,) * (width - len(values))
+
+    def column(self, name):
+        """Index of a header, or None when the sheet does not have it."""
+        try:
+            return self.headers.index(name)
+        except ValueError:
+            return None
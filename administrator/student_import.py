@@ -0,0 +1,87 @@
+from django.db import transaction
+
+from .models import Student, StudentEnrollment
+from .query_counter import QueryCounter
+from .report_card_cache import bump_school_report_cards, forget_student_class
+
+
+BATCH_SIZE = 500
+
+
+def normalize_name(name):
+    """The key a student is matched on, the same way the old name__iexact lookup did."""
+    return name.strip().lower()
+
+
+def import_students(school, session, class_level, rows):
+    """
+    Create or update a school's students from uploaded rows and enrol the
+    ones not yet enrolled for the session into class_level.
+
+    The school's students are loaded once into a dict keyed by normalized
+    name, so the whole import is a handful of bulk queries in one
+    transaction whatever the number of rows. A name that appears twice
+    updates the student created for its first row.
+    """
+    name_length = Student._meta.get_field('name').max_length
+    other_info_length = Student._meta.get_field('other_info').max_length
+
+    with QueryCounter() as counter:
+        with transaction.atomic():
+            # Ordered by id so the newest duplicate wins, as .first() on the default ordering did
+            students = {
+                normalize_name(student.name): student
+                for student in Student.objects.filter(school=school).order_by('id').only('id', 'name', 'other_info')
+            }
+
+            to_create = {}
+            to_update = {}
+            saved = updated = skipped = 0
+            for row in rows:
+                name = str(row.get('name') or '').strip()
+                other_info = str(row.get('other_info') or '').strip()
+                if not name or not other_info or len(name) > name_length or len(other_info) > other_info_length:
+                    skipped += 1
+                    continue
+
+                key = normalize_name(name)
+                student = students.get(key)
+                if student is None:
+                    student = Student(school=school, name=name.capitalize(), other_info=other_info)
+                    students[key] = student
+                    to_create[key] = student
+                    saved += 1
+                    continue
+
+                student.other_info = other_info
+                if key not in to_create:
+                    to_update[student.id] = student
+                updated += 1
+
+            Student.objects.bulk_create(to_create.values(), batch_size=BATCH_SIZE)
+            Student.objects.bulk_update(to_update.values(), ['other_info'], batch_size=BATCH_SIZE)
+
+            student_ids = {student.id for student in to_create.values()} | set(to_update)
+            enrolled_ids = set(
+                StudentEnrollment.objects.filter(student_id__in=student_ids, school=school, session=session)
+                .values_list('student_id', flat=True)
+            )
+            enrollments = [
+                StudentEnrollment(student_id=student_id, class_level=class_level, session=session, school=school)
+                for student_id in sorted(student_ids - enrolled_ids)
+            ]
+            StudentEnrollment.objects.bulk_create(enrollments, batch_size=BATCH_SIZE)
+
+    # bulk writes skip the Student and StudentEnrollment signals
+    for enrollment in enrollments:
+        forget_student_class(enrollment.student_id, session.id)
+    bump_school_report_cards(school.id)
+
+    return {
+        'saved': saved,
+        'updated': updated,
+        'enrolled': len(enrollments),
+        'skipped': skipped,
+        'query_count': counter.count,
+        'elapsed_seconds': counter.elapsed,
+    }
@@ -2,7 +2,6 @@ import os
 from django.conf import settings
 from django.http import FileResponse
 from rest_framework.exceptions import ParseError
-import pandas as pd
 from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -10,10 +9,13 @@ from rest_framework import status, generics
 from drf_yasg.utils import swagger_auto_schema
 from django.db import transaction
 from rest_framework.parsers import MultiPartParser, FormParser
-from administrator.models import AcademicSession, ClassLevel, SchoolProfile, Student, StudentEnrollment
+from administrator.models import AcademicSession, ClassLevel, SchoolProfile
 from rest_framework.permissions import IsAuthenticated
 
 from administrator.serializers import StudentUploadPreviewSerializer
+from administrator.student_import import import_students
+from administrator.upload_jobs import job_response, start_upload_job
+from administrator.upload_parsers import parse_student_sheet
 
 
 class DownloadTemplateView(APIView):
@@ -47,42 +49,27 @@ class PreviewStudentsUploadView(generics.GenericAPIView):
         if not class_level_id:
             return Response({'error': 'Class Level not selected.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            df = pd.read_excel(file)
-        except Exception as e:
-            return Response({'error': f'Invalid Excel file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        required_columns = ['Name', 'Other info']
-        if not all(col in df.columns for col in required_columns):
-            return Response({
-                'error': f'Missing required columns. Required: {required_columns}'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         class_level = ClassLevel.objects.filter(school=school, id=class_level_id).first()
 
         if not class_level:
             return Response({'error': 'Invalid class level selected.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        cleaned_data = []
-
-        for _, row in df.iterrows():
-            name = str(row['Name']).strip() if not pd.isna(row['Name']) else ''
-            other_info = str(row['Other info']).strip() if not pd.isna(row['Other info']) else ''
-
-            if name and other_info:
-                cleaned_data.append({
-                    'name': name,
-                    'other_info': other_info,
-                })
-
-        return Response({
-            'class_level': class_level.name,
-            'class_level_id': class_level.id,
-            'students': cleaned_data,
-            'total_valid': len(cleaned_data)
-        }, status=status.HTTP_200_OK)  
+        def finish(outcome):
+            if 'missing_columns' in outcome:
+                return 400, {'error': f"Missing required columns. Required: {outcome['missing_columns']}"}
+            return 200, {
+                'class_level': class_level.name,
+                'class_level_id': class_level.id,
+                'students': outcome['students'],
+                'total_valid': len(outcome['students']),
+                'parse_stats': outcome['parse_stats']
+            }
+
+        job, error = start_upload_job(file, parse_student_sheet, (), finish, school.id)
+        if error:
+            return error
+        return job_response(request, job)
 
 class UploadStudentsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -98,10 +85,9 @@ class UploadStudentsView(APIView):
             return Response({'error': 'Class Level ID is required.'}, status=status.HTTP_400_BAD_REQUEST)
         
 
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         
-        session = AcademicSession.objects.filter(school = school, is_current=True).first()
+        session = request.tenant.session
         if not session:
             return Response({"error": "session not set"}, status=404)
         
@@ -110,52 +96,9 @@ class UploadStudentsView(APIView):
         if not class_level:
             return Response({'error': 'Invalid class level selected.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        updated_rows = 0
-        skipped_rows = 0
-        created_students = 0
-        for student in students:
-            name = student.get('name', '').strip()
-            other_info = student.get('other_info', '').strip()
-
-            if not name or not other_info:
-                skipped_rows += 1
-                continue
-            
-
-            existingStudent = Student.objects.filter(name__iexact=name.capitalize(), school=school).first()
-            if existingStudent:
-                existingStudent.other_info = other_info
-                existingStudent.save()
-                updated_rows += 1
-                
-                existingStudentEnroll = StudentEnrollment.objects.filter(student = existingStudent, school=school, session = session).first()
-                if not existingStudentEnroll:
-                    StudentEnrollment.objects.create(
-                        student=existingStudent,
-                        class_level=class_level,
-                        session=session,
-                        school=school
-                    )
-            else:
-                new_student = Student.objects.create(
-                    school=school,
-                    name=name,
-                    other_info=other_info
-                )
-                created_students += 1
-                
-                existingStudentEnroll = StudentEnrollment.objects.filter(student = new_student, school=school, session = session).first()
-                if not existingStudentEnroll:
-                    StudentEnrollment.objects.create(
-                        student=new_student,
-                        class_level=class_level,
-                        session=session,
-                        school=school
-                    )
+        summary = import_students(school, session, class_level, students)
 
         return Response({
             'message': 'Student upload successful.',
-            'saved': created_students,
-            'updated': updated_rows,
-            'skipped': skipped_rows
+            **summary
         }, status=status.HTTP_201_CREATED)
\ No newline at end of file
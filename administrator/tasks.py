@@ -0,0 +1,21 @@
+from . import fees, promotion
+from .jobs import job
+from .models import AcademicSession, Levy
+
+
+@job('promote_students')
+def promote_students(session_id):
+    """Enrol every student of the school's previous session into the next class for the new session."""
+    session = AcademicSession.objects.filter(id=session_id).select_related('school').first()
+    if not session or not session.school:
+        return
+    promotion.promote_students(session.school, session)
+
+
+@job('assign_levy')
+def assign_levy(levy_id):
+    """Charge a new levy to every student enrolled for its session and term."""
+    levy = Levy.objects.filter(id=levy_id).first()
+    if not levy:
+        return
+    fees.assign_levy(levy)
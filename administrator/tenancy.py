@@ -0,0 +1,129 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from .models import AcademicSession, SchoolProfile, Term
+
+
+TENANT_CACHE_TIMEOUT = 60 * 60
+
+# cached for users without a school, so they aren't looked up on every request
+NO_SCHOOL = 0
+
+
+def _user_school_key(user_id):
+    return f'tenant_user_school_{user_id}'
+
+
+def _school_key(school_id):
+    return f'tenant_school_{school_id}'
+
+
+def _period_key(school_id):
+    return f'tenant_period_{school_id}'
+
+
+def get_user_school(user):
+    """The school the user works in, through the shared cache."""
+    if not getattr(user, 'is_authenticated', False):
+        return None
+
+    # Tokens carry the user's school (authentication.tokens), so only older tokens need the lookup
+    school_id = getattr(user, 'school_id', None) or cache.get(_user_school_key(user.pk))
+    if school_id is None:
+        school_id = SchoolProfile.objects.filter(user=user.pk).values_list('id', flat=True).first() or NO_SCHOOL
+        cache.set(_user_school_key(user.pk), school_id, TENANT_CACHE_TIMEOUT)
+    if school_id == NO_SCHOOL:
+        return None
+
+    school = cache.get(_school_key(school_id))
+    if school is None:
+        school = SchoolProfile.objects.filter(id=school_id).first()
+        if school is None:
+            cache.delete(_user_school_key(user.pk))
+            return None
+        cache.set(_school_key(school_id), school, TENANT_CACHE_TIMEOUT)
+    return school
+
+
+def get_current_period(school_id):
+    """
+    The school's current (session, term), either of which may be None,
+    through the shared cache. Only the write paths that change them (the
+    session and term toggles, new sessions, AcademicSession and Term saves)
+    invalidate it, so on the hot path it costs no queries.
+    """
+    period = cache.get(_period_key(school_id))
+    if period is None:
+        session = AcademicSession.objects.filter(school_id=school_id, is_current=True).first()
+        term = Term.objects.filter(session=session, is_current=True).first() if session else None
+        period = (session, term)
+        cache.set(_period_key(school_id), period, TENANT_CACHE_TIMEOUT)
+    return period
+
+
+def forget_current_period(school_id):
+    # Again on commit, in case a request cached the old period before the change committed
+    cache.delete(_period_key(school_id))
+    transaction.on_commit(lambda: cache.delete(_period_key(school_id)))
+
+
+def forget_school(school_id):
+    cache.delete(_school_key(school_id))
+
+
+def forget_user_school(*user_ids):
+    cache.delete_many([_user_school_key(user_id) for user_id in user_ids])
+
+
+class Tenant:
+    """
+    The school a request works in, with its current session and term. Each
+    is looked up the first time a view asks for it and reused for the rest
+    of the request; all of them come from the shared cache.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def is_admin(self):
+        return getattr(self.user, 'is_admin', False)
+
+    @property
+    def is_manager(self):
+        return getattr(self.user, 'is_manager', False)
+
+    @cached_property
+    def school(self):
+        return get_user_school(self.user)
+
+    @cached_property
+    def period(self):
+        if self.school is None:
+            return None, None
+        return get_current_period(self.school.id)
+
+    @property
+    def session(self):
+        return self.period[0]
+
+    @property
+    def term(self):
+        return self.period[1]
+
+
+class TenantMiddleware:
+    """
+    Attach request.tenant. It is resolved lazily because DRF authenticates
+    (JWT) inside the view; DRF's Request sets the authenticated user back on
+    the HttpRequest, so by the time a view reads request.tenant,
+    request.user is the API user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.tenant = SimpleLazyObject(lambda: Tenant(request.user))
+        return self.get_response(request)
@@ -1,3 +1,523 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import User
+from authentication.user_cache import get_auth_state
+
+from .annual_results import rank_scores, refresh_class_annual
+from .fees import assign_levy, refresh_term_fee_totals
+from .grading import get_grading_index
+from .jobs import claim, enqueue, extend_claim
+from .models import (
+    AcademicSession, AnnualSubjectResult, ClassLevel, ClassTermRanking, GradingSystem, Job, Levy, Parent, SchoolProfile, Student, StudentEnrollment, StudentFee,
+    StudentTermTotalFee, Term, TermTotalMark,
+)
+from .promotion import promote_students, set_class_progression
+from .rankings import get_student_ranking, refresh_class_ranking
+from .report_cards import ReportCardBuilder
+from .result_ingest import clean_result_rows, ingest_results
+
+
+class CacheTestCase(TestCase):
+    """The cache isn't rolled back with the database, so each test starts from an empty one."""
+
+    def setUp(self):
+        cache.clear()
+
+
+class ReportCardBuilderQueryBudgetTest(CacheTestCase):
+    QUERY_BUDGET = 5
+
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Budget school")
+        admin = User.objects.create_user(email="admin@budget.test", password="pass1234", is_admin=True, phone="08012345678")
+        self.school.user.add(admin)
+        self.session = AcademicSession.objects.create(school=self.school, name="2024/2025", is_current=True)
+        self.term = Term.objects.create(session=self.session, name="First term", is_current=True)
+        GradingSystem.objects.create(school=self.school, min_score=50, max_score=100, grade="A", remark="Pass")
+        GradingSystem.objects.create(school=self.school, min_score=0, max_score=49, grade="F", remark="Fail")
+        self.class_level = ClassLevel.objects.create(school=self.school, name="Jss1")
+
+    def _build_class(self, students, subjects):
+        rows_by_student = {}
+        for idx in range(students):
+            student = Student.objects.create(school=self.school, name=f"Student {idx}")
+            StudentEnrollment.objects.create(student=student, class_level=self.class_level, school=self.school, session=self.session)
+            rows = [
+                {'subject': f'Subject {number}', 'ca1': 10, 'ca2': 10, 'ca3': idx % 10, 'exam': 40 + number % 20}
+                for number in range(subjects)
+            ]
+            rows_by_student[student.id], _ = clean_result_rows(rows)
+        ingest_results(self.school, self.session, self.term, rows_by_student)
+        return list(rows_by_student)
+
+    def _count_queries(self, student_id):
+        builder = ReportCardBuilder(self.school, self.session, self.term)
+        with CaptureQueriesContext(connection) as queries:
+            report_card = builder.build(student_id)
+        return len(queries), report_card
+
+    def test_small_class_stays_within_budget(self):
+        student_ids = self._build_class(students=3, subjects=2)
+        count, report_card = self._count_queries(student_ids[0])
+        self.assertLessEqual(count, self.QUERY_BUDGET)
+        self.assertEqual(len(report_card['results']), 2)
+        self.assertEqual(report_card['performance_summary']['out_of_students'], 3)
+
+    def test_query_count_does_not_grow_with_subjects_or_class_size(self):
+        student_ids = self._build_class(students=3, subjects=2)
+        small_count, _ = self._count_queries(student_ids[0])
+
+        self.term = Term.objects.create(session=self.session, name="Second term")
+        student_ids = self._build_class(students=40, subjects=15)
+        large_count, report_card = self._count_queries(student_ids[-1])
+
+        self.assertLessEqual(large_count, self.QUERY_BUDGET)
+        self.assertEqual(large_count, small_count)
+        self.assertEqual(len(report_card['results']), 15)
+        self.assertEqual(report_card['student']['class'], "Jss1")
+
+
+class GradingIndexTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Grading school")
+        self.pass_band = GradingSystem.objects.create(school=self.school, min_score=50, max_score=100, grade="A", remark="Pass")
+        GradingSystem.objects.create(school=self.school, min_score=0, max_score=49, grade="F", remark="Fail")
+
+    def test_index_is_reused_without_queries(self):
+        index = get_grading_index(self.school.id)
+        with CaptureQueriesContext(connection) as queries:
+            again = get_grading_index(self.school.id)
+            grade = again.resolve(75)
+        self.assertIs(again, index)
+        self.assertEqual(grade, ("A", "Pass"))
+        self.assertEqual(len(queries), 0)
+
+    def test_saving_a_band_invalidates_the_index(self):
+        index = get_grading_index(self.school.id)
+        self.pass_band.grade = "B"
+        self.pass_band.save()
+        updated = get_grading_index(self.school.id)
+        self.assertIsNot(updated, index)
+        self.assertEqual(updated.resolve(75), ("B", "Pass"))
+
+    def test_deleting_a_band_invalidates_the_index(self):
+        get_grading_index(self.school.id)
+        self.pass_band.delete()
+        self.assertIsNone(get_grading_index(self.school.id).resolve(75))
+
+    def test_other_schools_keep_their_index(self):
+        other = SchoolProfile.objects.create(school_name="Other grading school")
+        GradingSystem.objects.create(school=other, min_score=0, max_score=100, grade="P", remark="Pass")
+        index = get_grading_index(other.id)
+        self.pass_band.delete()
+        self.assertIs(get_grading_index(other.id), index)
+
+
+class TokenRevocationTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Token school")
+        self.admin = User.objects.create_user(email="admin@token.test", password="pass1234", is_admin=True, phone="08012345678")
+        self.manager = User.objects.create_user(email="manager@token.test", password="pass1234", is_manager=True, phone="08012345679")
+        self.school.user.add(self.admin, self.manager)
+
+    def _login(self, email):
+        client = APIClient()
+        response = client.post('/auth/api/user/login/', {'email': email, 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['access'])
+        return client
+
+    def test_deactivating_a_user_revokes_their_token(self):
+        admin, manager = self._login("admin@token.test"), self._login("manager@token.test")
+        self.assertEqual(manager.get('/admins/api/classlevels/').status_code, 200)
+
+        admin.post(f'/admins/api/school/users/deactivate/{self.manager.id}/')
+        self.assertEqual(manager.get('/admins/api/classlevels/').status_code, 401)
+
+    def test_leaving_the_school_revokes_the_school_claim(self):
+        manager = self._login("manager@token.test")
+        self.school.user.remove(self.manager)
+        self.assertEqual(manager.get('/admins/api/classlevels/').status_code, 401)
+
+    def test_role_change_revokes_the_role_claim(self):
+        manager = self._login("manager@token.test")
+        self.manager.is_manager = False
+        self.manager.save()
+        self.assertEqual(manager.get('/admins/api/classlevels/').status_code, 401)
+        self.assertEqual(self._login("manager@token.test").get('/admins/api/classlevels/').status_code, 200)
+
+    def test_revocation_survives_a_cache_flush(self):
+        manager = self._login("manager@token.test")
+        User.objects.filter(id=self.manager.id).update(is_active=False)
+        cache.clear()
+        self.assertEqual(manager.get('/admins/api/classlevels/').status_code, 401)
+
+    def test_password_change_revokes_old_tokens(self):
+        manager = self._login("manager@token.test")
+        response = manager.post('/auth/api/user/change/password/', {'password': 'pass1234', 'password1': 'newpass123', 'password2': 'newpass123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(manager.get('/admins/api/classlevels/').status_code, 401)
+
+
+class LegacyTokenAuthStateTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Legacy school")
+        self.user = User.objects.create_user(email="legacy@token.test", password="pass1234", is_admin=True, phone="08012345678")
+        self.school.user.add(self.user)
+        # Issued before tokens carried our claims
+        token = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_legacy_token_authenticates(self):
+        self.assertEqual(self.client.get('/admins/api/classlevels/').status_code, 200)
+
+    def test_deactivation_applies_to_the_next_request(self):
+        self.client.get('/admins/api/classlevels/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/admins/api/classlevels/').status_code, 401)
+
+    def test_cached_state_holds_no_password_hash(self):
+        state = get_auth_state(self.user.id)
+        self.assertEqual(set(state), {'is_active', 'token_version', 'password_hash'})
+        self.assertNotEqual(state['password_hash'], self.user.password)
+
+
+class ParentPortalTestCase(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Parent school")
+        self.session = AcademicSession.objects.create(school=self.school, name="2024/2025", is_current=True, show=True)
+        self.term = Term.objects.create(session=self.session, name="First term", is_current=True)
+        class_level = ClassLevel.objects.create(school=self.school, name="Jss1")
+        self.own_student, self.other_student = [
+            Student.objects.create(school=self.school, name=name) for name in ("Own child", "Other child")
+        ]
+        for student in (self.own_student, self.other_student):
+            StudentEnrollment.objects.create(student=student, class_level=class_level, school=self.school, session=self.session)
+        self.parent = Parent(school=self.school, name="Parent", email="parent@portal.test")
+        self.parent.set_password("pass1234")
+        self.parent.student.set([self.own_student])
+
+    def _login(self):
+        client = APIClient()
+        response = client.post('/admins/api/parent/login/', {'email': 'parent@portal.test', 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        client.credentials(HTTP_X_PARENT_CODE=response.data['access_code'])
+        return client
+
+    def _children(self, client):
+        response = client.get(f'/admins/api/parent/get/students/session/lists/{self.session.id}/')
+        if response.status_code != 200:
+            return response.status_code
+        return {enrollment['student']['id'] for enrollment in response.data}
+
+
+class ParentAccessCodeTest(ParentPortalTestCase):
+    def test_access_code_sees_only_the_parents_children(self):
+        client = self._login()
+        self.assertEqual(self._children(client), {self.own_student.id})
+        response = client.post(f'/admins/api/parent/get/students/result/{self.other_student.id}/{self.session.id}/{self.term.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_reassigning_students_refreshes_the_snapshot(self):
+        client = self._login()
+        self._children(client)
+        self.parent.student.set([self.other_student])
+        self.assertEqual(self._children(client), {self.other_student.id})
+
+    def test_deactivation_rejects_the_access_code(self):
+        client = self._login()
+        self._children(client)
+        self.parent.is_active = False
+        self.parent.save()
+        self.assertEqual(self._children(client), 403)
+
+    def test_new_login_rotates_the_access_code(self):
+        client = self._login()
+        self._login()
+        self.assertEqual(self._children(client), 403)
+
+
+@override_settings(PARENT_SIGNED_TOKENS=True)
+class SignedParentTokenTest(ParentPortalTestCase):
+    def test_signed_token_authenticates(self):
+        client = self._login()
+        self.assertEqual(self._children(client), {self.own_student.id})
+
+    def test_tampered_token_is_rejected(self):
+        response = self.client.post('/admins/api/parent/login/', {'email': 'parent@portal.test', 'password': 'pass1234'}, format='json')
+        payload, signature = response.data['access_code'].rsplit(':', 1)
+        client = APIClient()
+        client.credentials(HTTP_X_PARENT_CODE=f'{payload}:{signature[::-1]}')
+        self.assertEqual(self._children(client), 403)
+
+    def test_logout_revokes_the_token(self):
+        client = self._login()
+        self.assertEqual(client.post('/admins/api/parent/logout/').status_code, 200)
+        self.assertEqual(self._children(client), 403)
+        self.assertEqual(self._children(self._login()), {self.own_student.id})
+
+    def test_deactivation_revokes_the_token(self):
+        client = self._login()
+        self.parent.is_active = False
+        self.parent.save()
+        self.assertEqual(self._children(client), 403)
+
+    def test_reassigning_students_revokes_the_token(self):
+        client = self._login()
+        self.parent.student.set([self.other_student])
+        self.assertEqual(self._children(client), 403)
+        self.assertEqual(self._children(self._login()), {self.other_student.id})
+
+    def test_revocation_survives_a_cache_flush(self):
+        client = self._login()
+        self.parent.is_active = False
+        self.parent.save()
+        self.assertEqual(self._children(client), 403)
+        cache.clear()
+        self.assertEqual(self._children(client), 403)
+
+    def test_logout_survives_a_cache_flush(self):
+        client = self._login()
+        client.post('/admins/api/parent/logout/')
+        cache.clear()
+        self.assertEqual(self._children(client), 403)
+
+
+class RankingPolicyTest(CacheTestCase):
+    TOTALS = [300, 250, 250, 200]
+
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Ranking school")
+        self.admin = User.objects.create_user(email="admin@ranking.test", password="pass1234", is_admin=True, phone="08012345678")
+        self.school.user.add(self.admin)
+        self.session = AcademicSession.objects.create(school=self.school, name="2024/2025", is_current=True)
+        self.term = Term.objects.create(session=self.session, name="First term", is_current=True)
+        self.class_level = ClassLevel.objects.create(school=self.school, name="Jss1")
+        self.students = []
+        for idx, total in enumerate(self.TOTALS):
+            student = Student.objects.create(school=self.school, name=f"Student {idx}")
+            StudentEnrollment.objects.create(student=student, class_level=self.class_level, school=self.school, session=self.session)
+            TermTotalMark.objects.create(student=student, term=self.term, session=self.session, total_score=total)
+            self.students.append(student)
+
+    def _positions(self):
+        rankings = {ranking.student_id: ranking.position for ranking in refresh_class_ranking(self.class_level.id, self.term.id, self.session.id)}
+        return [rankings[student.id] for student in self.students]
+
+    def test_competition_ties_skip_the_next_position(self):
+        self.assertEqual(self._positions(), [1, 2, 2, 4])
+
+    def test_dense_ties_keep_positions_consecutive(self):
+        self.school.ranking_policy = 'dense'
+        self.school.save()
+        self.assertEqual(self._positions(), [1, 2, 2, 3])
+
+    def test_changing_the_policy_clears_stored_rankings(self):
+        self._positions()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.put('/admins/api/school-info/update/', {'ranking_policy': 'dense'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ClassTermRanking.objects.filter(class_level=self.class_level).exists())
+        # Rebuilt with the new policy on the next read
+        self.assertEqual(get_student_ranking(self.students[-1].id, self.term.id, self.session.id).position, 3)
+
+
+class AnnualResultTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Annual school")
+        self.session = AcademicSession.objects.create(school=self.school, name="2024/2025", is_current=True)
+        self.first_term = Term.objects.create(session=self.session, name="First term", is_current=True)
+        self.second_term = Term.objects.create(session=self.session, name="Second term")
+        GradingSystem.objects.create(school=self.school, min_score=70, max_score=100, grade="A", remark="Excellent")
+        GradingSystem.objects.create(school=self.school, min_score=0, max_score=69, grade="C", remark="Credit")
+        self.class_level = ClassLevel.objects.create(school=self.school, name="Jss1")
+        self.first, self.second = [Student.objects.create(school=self.school, name=name) for name in ("First", "Second")]
+        for student in (self.first, self.second):
+            StudentEnrollment.objects.create(student=student, class_level=self.class_level, school=self.school, session=self.session)
+
+    def _ingest(self, term, scores_by_student):
+        rows_by_student = {}
+        for student, scores in scores_by_student.items():
+            rows = [{'subject': subject, 'ca1': 10, 'ca2': 10, 'ca3': 10, 'exam': total - 30} for subject, total in scores.items()]
+            rows_by_student[student.id], _ = clean_result_rows(rows)
+        ingest_results(self.school, self.session, term, rows_by_student)
+
+    def test_rank_scores_tie_policies(self):
+        self.assertEqual(rank_scores([90, 80, 80, 70]), [1, 2, 2, 4])
+        self.assertEqual(rank_scores([90, 80, 80, 70], 'dense'), [1, 2, 2, 3])
+        self.assertEqual(rank_scores([]), [])
+
+    def test_subjects_average_over_the_terms_they_were_taken(self):
+        self._ingest(self.first_term, {self.first: {'Maths': 80, 'English': 60}, self.second: {'Maths': 50, 'English': 50}})
+        self._ingest(self.second_term, {self.first: {'Maths': 70}, self.second: {'Maths': 50, 'English': 50}})
+
+        annual = {result.student_id: result for result in refresh_class_annual(self.class_level.id, self.session.id)}
+        subjects = {
+            row.subjects: row for row in AnnualSubjectResult.objects.filter(student=self.first, session=self.session)
+        }
+
+        self.assertEqual(subjects['Maths'].term_totals, {'First term': 80, 'Second term': 70})
+        self.assertEqual((subjects['Maths'].average, subjects['Maths'].grade), (75, 'A'))
+        self.assertEqual((subjects['English'].terms_count, subjects['English'].average), (1, 60))
+
+        self.assertEqual((annual[self.first.id].total, annual[self.first.id].average), (210, 67.5))
+        self.assertEqual([annual[self.first.id].position, annual[self.second.id].position], [1, 2])
+        self.assertEqual(annual[self.first.id].class_average, 58.75)
+        self.assertEqual(annual[self.first.id].class_size, 2)
+
+    def test_students_without_results_are_left_out(self):
+        self._ingest(self.first_term, {self.first: {'Maths': 80}})
+        annual = refresh_class_annual(self.class_level.id, self.session.id)
+        self.assertEqual([result.student_id for result in annual], [self.first.id])
+        self.assertEqual(annual[0].class_size, 2)
+
+
+class PromotionTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Promotion school")
+        self.admin = User.objects.create_user(email="admin@promotion.test", password="pass1234", is_admin=True, phone="08012345678")
+        self.school.user.add(self.admin)
+        self.old_session = AcademicSession.objects.create(school=self.school, name="2023/2024")
+        # Created out of order: the progression follows ClassLevel.order, not creation
+        self.jss2 = ClassLevel.objects.create(school=self.school, name="Jss2", order=2)
+        self.jss1 = ClassLevel.objects.create(school=self.school, name="Jss1", order=1)
+        self.jss3 = ClassLevel.objects.create(school=self.school, name="Jss3", order=3)
+        self.students = {}
+        for name, class_level in (("Ada", self.jss1), ("Bola", self.jss1), ("Chidi", self.jss2), ("Dayo", self.jss3)):
+            student = Student.objects.create(school=self.school, name=name)
+            StudentEnrollment.objects.create(student=student, class_level=class_level, school=self.school, session=self.old_session)
+            self.students[name] = student
+        self.session = AcademicSession.objects.create(school=self.school, name="2024/2025", is_current=True)
+
+    def _new_classes(self):
+        return dict(
+            StudentEnrollment.objects.filter(session=self.session).values_list('student__name', 'class_level__name')
+        )
+
+    def test_preview_writes_nothing(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/admins/api/sessions/promotion/preview/', {'session_id': self.session.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual((response.data['promoted'], response.data['graduating']), (3, 1))
+        self.assertEqual(
+            [(summary['class_level'], summary['promote_to'], summary['students']) for summary in response.data['classes']],
+            [("Jss1", "Jss2", 2), ("Jss2", "Jss3", 1), ("Jss3", None, 1)],
+        )
+        self.assertEqual(self._new_classes(), {})
+
+    def test_promotion_follows_class_order_and_runs_once(self):
+        summary = promote_students(self.school, self.session)
+        self.assertEqual((summary['promoted'], summary['graduating']), (3, 1))
+        self.assertEqual(self._new_classes(), {"Ada": "Jss2", "Bola": "Jss2", "Chidi": "Jss3"})
+
+        again = promote_students(self.school, self.session)
+        self.assertEqual((again['promoted'], again['already_enrolled']), (0, 3))
+        self.assertEqual(StudentEnrollment.objects.filter(session=self.session).count(), 3)
+
+    def test_reordering_the_progression_changes_the_plan(self):
+        self.assertTrue(set_class_progression(self.school, [self.jss3.id, self.jss2.id, self.jss1.id]))
+        self.assertFalse(set_class_progression(self.school, [self.jss1.id]))
+
+        promote_students(self.school, self.session)
+        self.assertEqual(self._new_classes(), {"Dayo": "Jss2", "Chidi": "Jss1"})
+
+
+class LevyTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school = SchoolProfile.objects.create(school_name="Levy school")
+        self.session = AcademicSession.objects.create(school=self.school, name="2024/2025", is_current=True)
+        self.term = Term.objects.create(session=self.session, name="First term", is_current=True)
+        self.class_level = ClassLevel.objects.create(school=self.school, name="Jss1")
+        self.students = [Student.objects.create(school=self.school, name=f"Student {idx}") for idx in range(3)]
+        for student in self.students:
+            StudentEnrollment.objects.create(student=student, class_level=self.class_level, school=self.school, session=self.session)
+
+    def _levy(self, name, amount):
+        return Levy.objects.create(school=self.school, session=self.session, term=self.term, name=name, amount=amount)
+
+    def _totals(self):
+        return {
+            row.student_id: (row.total_amount, row.to_balance, row.paid)
+            for row in StudentTermTotalFee.objects.filter(session=self.session, term=self.term)
+        }
+
+    def test_levy_is_charged_once_per_enrolled_student(self):
+        levy = self._levy("tuition", 1000)
+        summary = assign_levy(levy)
+        self.assertEqual((summary['charged'], summary['already_charged']), (3, 0))
+        self.assertEqual(StudentFee.objects.filter(levy="Tuition").count(), 3)
+        self.assertEqual(set(self._totals().values()), {(1000, 1000, False)})
+
+        again = assign_levy(levy)
+        self.assertEqual((again['charged'], again['already_charged']), (0, 3))
+        self.assertEqual(StudentFee.objects.filter(levy="Tuition").count(), 3)
+
+    def test_fan_out_does_not_grow_with_the_class(self):
+        small = assign_levy(self._levy("tuition", 1000))['query_count']
+        for idx in range(3, 20):
+            student = Student.objects.create(school=self.school, name=f"Student {idx}")
+            StudentEnrollment.objects.create(student=student, class_level=self.class_level, school=self.school, session=self.session)
+        second_term = Term.objects.create(session=self.session, name="Second term")
+        levy = Levy.objects.create(school=self.school, session=self.session, term=second_term, name="tuition", amount=1000)
+        self.assertEqual(assign_levy(levy)['query_count'], small)
+
+    def test_new_levy_keeps_what_was_already_paid(self):
+        assign_levy(self._levy("tuition", 1000))
+        paid = self.students[0]
+        StudentTermTotalFee.objects.filter(student=paid).update(to_balance=0, paid=True)
+
+        assign_levy(self._levy("books", 200))
+        totals = self._totals()
+        self.assertEqual(totals[paid.id], (1200, 200, False))
+        self.assertEqual(totals[self.students[1].id], (1200, 1200, False))
+
+    def test_refresh_follows_removed_fees(self):
+        assign_levy(self._levy("tuition", 1000))
+        student = self.students[0]
+        StudentTermTotalFee.objects.filter(student=student).update(to_balance=400)
+
+        StudentFee.objects.filter(student=student).delete()
+        refresh_term_fee_totals(self.session.id, self.term.id, [student.id])
+        self.assertEqual(self._totals()[student.id], (0, -600, True))
+
+
+class JobClaimTest(TestCase):
+    def test_running_job_keeps_its_claim_until_it_finishes(self):
+        queued = claim(enqueue('assign_levy', levy_id=0).id, worker='first')
+        Job.objects.filter(id=queued.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertTrue(extend_claim(queued))
+        self.assertGreater(Job.objects.get(id=queued.id).locked_until, timezone.now())
+        self.assertIsNone(claim(queued.id, worker='second'))
+
+        Job.objects.filter(id=queued.id).update(status='done')
+        self.assertFalse(extend_claim(queued))
+
+    def test_stale_claim_is_not_extended(self):
+        queued = claim(enqueue('assign_levy', levy_id=0).id, worker='first')
+        Job.objects.filter(id=queued.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim(queued.id, worker='second').locked_by, 'second')
+        self.assertFalse(extend_claim(queued))
@@ -0,0 +1,189 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+from rest_framework.response import Response
+
+from .spreadsheets import InvalidSpreadsheet, SpreadsheetTooLarge
+
+
+UPLOAD_JOB_TIMEOUT = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_finisher = None
+_slots = None
+_lock = threading.Lock()
+
+
+class UploadPoolSaturated(Exception):
+    pass
+
+
+def _job_key(job_id):
+    return f'upload_job_{job_id}'
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _get_executor():
+    # Spawned, not forked: the request worker may hold threads and DB connections
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.UPLOAD_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.UPLOAD_PARSE_WORKERS + settings.UPLOAD_PARSE_QUEUE)
+        return _executor, _slots
+
+
+def _get_finisher():
+    global _finisher
+    with _lock:
+        if _finisher is None:
+            _finisher = ThreadPoolExecutor(max_workers=settings.UPLOAD_PARSE_WORKERS, thread_name_prefix='upload-finish')
+        return _finisher
+
+
+def report_progress(job_id, rows):
+    """Called from the parsing process; the shared cache makes it visible to every worker."""
+    job = cache.get(_job_key(job_id))
+    if job is not None and job['status'] in ('queued', 'running'):
+        cache.set(_job_key(job_id), {**job, 'status': 'running', 'rows': rows}, UPLOAD_JOB_TIMEOUT)
+
+
+class UploadJob:
+    """
+    A workbook parse running in the upload process pool. finish turns the
+    parser's outcome into (status_code, body) on a finisher thread of this
+    process, which is where staging and saving the rows happen.
+    """
+
+    def __init__(self, job_id, finish):
+        self.id = job_id
+        self.finish = finish
+
+
+def submit_upload(file, parser, args, finish, school_id):
+    """
+    Copy the upload to a temporary file and parse it in the pool with
+    parser(job_id, path, *args). Raises SpreadsheetTooLarge before copying an
+    oversized file and UploadPoolSaturated when every worker and queue slot
+    is taken.
+    """
+    if file.size > settings.UPLOAD_MAX_BYTES:
+        raise SpreadsheetTooLarge(f'File is larger than {settings.UPLOAD_MAX_BYTES / (1024 * 1024):.1f} MB.')
+
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise UploadPoolSaturated()
+
+    path = None
+    try:
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        with os.fdopen(fd, 'wb') as upload:
+            for chunk in file.chunks():
+                upload.write(chunk)
+
+        job = UploadJob(uuid.uuid4().hex, finish)
+        cache.set(_job_key(job.id), {
+            'id': job.id,
+            'school_id': school_id,
+            'status': 'queued',
+            'rows': 0,
+            'response_status': None,
+            'response': None,
+        }, UPLOAD_JOB_TIMEOUT)
+        future = executor.submit(parser, job.id, path, *args)
+    except BaseException:
+        slots.release()
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+        raise
+
+    # Off the pool's manager thread, which would otherwise stall every other upload's result
+    future.add_done_callback(lambda future: _get_finisher().submit(_complete, job, path, future))
+    return job
+
+
+def _complete(job, path, future):
+    global _executor
+    try:
+        try:
+            outcome = future.result()
+            response_status, response = job.finish(outcome)
+        except SpreadsheetTooLarge as e:
+            response_status, response = 413, {'detail': str(e)}
+        except InvalidSpreadsheet as e:
+            response_status, response = 400, {'detail': str(e)}
+        except BrokenProcessPool:
+            with _lock:
+                _executor = None
+            response_status, response = 503, {'detail': 'The upload workers stopped unexpectedly. Try again.'}
+        except Exception:
+            logger.exception('Upload job %s failed', job.id)
+            response_status, response = 500, {'detail': 'The file could not be processed.'}
+
+        job_entry = cache.get(_job_key(job.id)) or {'id': job.id, 'school_id': None, 'rows': 0}
+        cache.set(_job_key(job.id), {
+            **job_entry,
+            'status': 'done' if response_status < 400 else 'failed',
+            'response_status': response_status,
+            'response': response,
+        }, UPLOAD_JOB_TIMEOUT)
+    finally:
+        _slots.release()
+        if os.path.exists(path):
+            os.remove(path)
+        # finish used the database from this finisher thread
+        connections.close_all()
+
+
+def get_upload_job(job_id, school_id):
+    job = cache.get(_job_key(job_id))
+    if job is None or job['school_id'] != school_id:
+        return None
+    return job
+
+
+def start_upload_job(file, parser, args, finish, school_id):
+    """
+    Submit an upload to the pool. Returns (job, error_response); oversized
+    files get 413 and a saturated pool 429 with Retry-After.
+    """
+    try:
+        return submit_upload(file, parser, args, finish, school_id), None
+    except SpreadsheetTooLarge as e:
+        return None, Response({'detail': str(e)}, status=413)
+    except UploadPoolSaturated:
+        return None, Response(
+            {'detail': 'Too many uploads are being processed right now. Try again shortly.'},
+            status=429,
+            headers={'Retry-After': '5'},
+        )
+
+
+def job_response(request, job):
+    """Answer 202 straight away with the job id and the URL to poll for its outcome."""
+    return Response({
+        'job_id': job.id,
+        'status': 'queued',
+        'status_url': request.build_absolute_uri(reverse('upload-job-status', args=[job.id])),
+    }, status=202)
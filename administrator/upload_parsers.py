@@ -0,0 +1,105 @@
+# Workbook parsers run in the upload process pool. They only read the file
+# and validate rows in memory: whatever they need from the database is passed
+# in, and the only cache write from here is the job's row progress
+# (report_progress). Staging and saving rows happen back in the web process.
+from functools import partial
+
+from .class_workbooks import parse_class_workbook
+from .result_ingest import clean_result_rows
+from .spreadsheets import SpreadsheetReader
+from .upload_jobs import report_progress
+
+
+RESULT_SHEET_HEADERS = ['Subject', 'CA1', 'CA2', 'CA3', 'Exam']
+STUDENT_SHEET_COLUMNS = ['Name', 'Other info']
+
+
+def _is_valid_score(value):
+    try:
+        if value is None:
+            return False
+        int(value)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def parse_student_result_sheet(job_id, path, db_subjects):
+    """One student's result sheet: the rows ready for staging and the rows skipped, by sheet row."""
+    valid_rows = []
+    valid_row_numbers = []
+    skipped_rows = []
+
+    with SpreadsheetReader(path, progress=partial(report_progress, job_id)) as sheet:
+        if sheet.headers[:len(RESULT_SHEET_HEADERS)] != RESULT_SHEET_HEADERS:
+            return {'invalid_headers': RESULT_SHEET_HEADERS}
+
+        for idx, row in sheet.rows():
+            subject_name = str(row[0]).strip() if row[0] else None
+            ca1, ca2, ca3, exam = row[1], row[2], row[3], row[4]
+
+            # Check subject name present and valid
+            if not subject_name or subject_name not in db_subjects:
+                skipped_rows.append({'row': idx, 'reason': 'Invalid or missing subject name', 'data': row})
+                continue
+
+            # Check all scores are valid (not None and intable)
+            if not all(_is_valid_score(score) for score in (ca1, ca2, ca3, exam)):
+                skipped_rows.append({'row': idx, 'reason': 'One or more scores missing or invalid', 'data': row})
+                continue
+
+            valid_row_numbers.append(idx)
+            valid_rows.append({
+                'subject': subject_name,
+                'ca1': int(ca1),
+                'ca2': int(ca2),
+                'ca3': int(ca3),
+                'exam': int(exam)
+            })
+
+    cleaned_rows, errors = clean_result_rows(valid_rows)
+    for error in errors:
+        skipped_rows.append({'row': valid_row_numbers[error['row']], 'reason': error['reason']})
+    skipped_rows.sort(key=lambda skipped: skipped['row'])
+
+    return {
+        'valid_rows': cleaned_rows,
+        'skipped_rows': skipped_rows,
+        'parse_stats': sheet.stats,
+    }
+
+
+def parse_class_result_sheet(job_id, path, students, subjects):
+    rows_by_student, errors, parse_stats = parse_class_workbook(
+        path, students, subjects, progress=partial(report_progress, job_id)
+    )
+    return {
+        'rows_by_student': rows_by_student,
+        'errors': errors,
+        'parse_stats': parse_stats,
+    }
+
+
+def parse_student_sheet(job_id, path):
+    """The student import sheet: every row with both a name and other info."""
+    cleaned_data = []
+    with SpreadsheetReader(path, progress=partial(report_progress, job_id)) as sheet:
+        if not all(col in sheet.headers for col in STUDENT_SHEET_COLUMNS):
+            return {'missing_columns': STUDENT_SHEET_COLUMNS}
+
+        name_column = sheet.column('Name')
+        other_info_column = sheet.column('Other info')
+        for _, row in sheet.rows():
+            name = str(row[name_column]).strip() if row[name_column] is not None else ''
+            other_info = str(row[other_info_column]).strip() if row[other_info_column] is not None else ''
+
+            if name and other_info:
+                cleaned_data.append({
+                    'name': name,
+                    'other_info': other_info,
+                })
+
+    return {
+        'students': cleaned_data,
+        'parse_stats': sheet.stats,
+    }
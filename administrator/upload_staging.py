@@ -0,0 +1,88 @@
+import secrets
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import StagedUpload
+from .result_ingest import ingest_results
+
+
+STAGED_UPLOAD_TIMEOUT = 60 * 30
+
+
+class StagedUploadNotFound(Exception):
+    pass
+
+
+class StagedUploadInProgress(Exception):
+    pass
+
+
+def _expired_before():
+    return timezone.now() - timedelta(seconds=STAGED_UPLOAD_TIMEOUT)
+
+
+def stage_results(school, session, term, rows_by_student, student_id=None):
+    """
+    Keep validated rows server-side until they are confirmed, so confirm
+    only needs the returned token. They live in the database, so any worker
+    can confirm them. student_id marks a single-student upload, which may
+    take comments on confirm.
+    """
+    StagedUpload.objects.filter(created_at__lt=_expired_before()).delete()
+    staged = StagedUpload.objects.create(
+        token=secrets.token_urlsafe(24),
+        school=school,
+        session=session,
+        term=term,
+        student_id=student_id,
+        rows_by_student=rows_by_student,
+    )
+    return staged.token
+
+
+def get_staged_upload(token, school):
+    staged = None
+    if token:
+        staged = (
+            StagedUpload.objects.filter(token=token, school=school, created_at__gte=_expired_before())
+            .select_related('session', 'term')
+            .first()
+        )
+    if staged is None:
+        raise StagedUploadNotFound()
+    return staged
+
+
+def confirm_staged_upload(token, school, teacher_comment=None, principal_comment=None):
+    """
+    Save staged rows exactly once, into the session and term they were
+    previewed for. A repeated confirm returns the summary of the first one;
+    a confirm racing another raises StagedUploadInProgress.
+    Returns (summary, created) where created is False for a replay.
+    """
+    staged = get_staged_upload(token, school)
+    if staged.summary is not None:
+        return staged.summary, False
+
+    # A conditional UPDATE, so only one confirm gets to ingest the rows
+    if not StagedUpload.objects.filter(id=staged.id, claimed_at__isnull=True).update(claimed_at=timezone.now()):
+        raise StagedUploadInProgress()
+
+    comments = None
+    if staged.student_id is not None:
+        comments = {staged.student_id: {'teacher_comment': teacher_comment, 'principal_comment': principal_comment}}
+    # JSON object keys come back as strings
+    rows_by_student = {int(student_id): rows for student_id, rows in staged.rows_by_student.items()}
+
+    try:
+        with transaction.atomic():
+            summary = ingest_results(school, staged.session, staged.term, rows_by_student, comments=comments)
+            # Keep the rows out of the replay entry; only the outcome is needed now
+            StagedUpload.objects.filter(id=staged.id).update(rows_by_student={}, summary=summary)
+    except Exception:
+        StagedUpload.objects.filter(id=staged.id).update(claimed_at=None)
+        raise
+
+    return summary, True
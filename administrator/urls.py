@@ -18,6 +18,8 @@ urlpatterns = [
     
     path('classlevels/', ClassLevelListAPIView.as_view()),
     path('classlevels/<int:class_level_id>/students/', ClassLevelStudentsAPIView.as_view()),
+    path('classlevels/order/', ClassLevelOrderView.as_view()),
+    path('sessions/promotion/preview/', PromotionPreviewView.as_view()),
     path('students/<int:student_id>/', StudentDetailAPIView.as_view()),
     
     path('download/students-upload-template/', DownloadTemplateView.as_view()),
@@ -50,11 +52,22 @@ urlpatterns = [
     path('result/upload/', ConfirmUploadStudentResultView.as_view()),
     path('result/reset/<int:student_id>/', ResetStudentResultView.as_view()),
     path('show/result/<int:student_id>/', ShowStudentResultView.as_view()),
+    path('show/results/class/<int:class_level_id>/', ShowClassResultsView.as_view()),
+    path('result/printout/<int:student_id>/', ResultPrintoutView.as_view()),
+    path('result/printout/class/<int:class_level_id>/', ClassResultPrintoutView.as_view()),
+    path('result/annual/<int:student_id>/', ShowStudentAnnualResultView.as_view()),
+    path('result/annual/class/<int:class_level_id>/', ShowClassAnnualResultsView.as_view()),
+    path('result/broadsheet/class/<int:class_level_id>/', ClassBroadsheetView.as_view()),
+    path('result/template/class/<int:class_level_id>/', ClassResultTemplateView.as_view()),
+    path('result/upload/class/<int:class_level_id>/', UploadClassResultView.as_view()),
+    path('upload/jobs/<str:job_id>/', UploadJobStatusView.as_view(), name='upload-job-status'),
+    path('jobs/<int:job_id>/', JobStatusView.as_view()),
     path('get/comments/<int:student_id>/', GetStudentCommentView.as_view()),
     
     # parent urls
     
     path('parent/login/', ParentLoginView.as_view(), name='parent-login'),
+    path('parent/logout/', ParentLogoutView.as_view()),
     path('parents/', ParentCreateListsView.as_view(), name='parent-create'),
     path('parents/<int:pk>/', ParentDetailView.as_view()),
     path('parent/dashboard/', ParentDashboardView.as_view()),
@@ -66,6 +79,7 @@ urlpatterns = [
     path("parent/get/session/lists/", ParentGetSessionView.as_view()),
     path("parent/get/students/session/lists/<int:session_id>/", ParentGetStudentsSessionView.as_view()),
     path("parent/get/students/result/<int:student_id>/<int:session_id>/<int:term_id>/", ParentShowStudentResultView.as_view()),
+    path("parent/get/students/annual/result/<int:student_id>/<int:session_id>/", ParentShowStudentAnnualResultView.as_view()),
     
     # Levy
     
@@ -16,7 +16,11 @@ from django.db import transaction
 from rest_framework.parsers import MultiPartParser, FormParser
 from administrator.serializers import AcademicSessionSerializer, ClassLevelSerializer, CreateUserSerializer, DashboardSerializer, GradeSystemSerializer, MainInfoSerializer, ResultSerializer, SchoolProfileSerializer, StudentEnrollmentSerializer, StudentSerializer, StudentUploadPreviewSerializer, SubjectsSerializer, SubscriptionSerializer, TermTotalMarkSerializer, UserSerializer
 from authentication.models import User
-from .models import AcademicSession, ClassLevel, GradingSystem, Result, Student, StudentEnrollment, Subject, Subscription, Term, SchoolProfile, TermTotalMark
+from authentication.tokens import bump_token_version
+from .models import AcademicSession, ClassLevel, GradingSystem, Job, Result, Student, StudentEnrollment, Subject, Subscription, Term, SchoolProfile, TermTotalMark
+from .promotion import preview_promotion, set_class_progression
+from .rankings import clear_school_rankings
+from .tenancy import forget_current_period
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 
@@ -61,17 +65,16 @@ class DashboardAPIView(APIView):
     @swagger_auto_schema(tags=["Admins"])
     def get(self, request):
         # Get the school for the current user
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         
         if not school:
             return Response({"detail": "No school profile associated with user."}, status=404)
 
-        current_session = AcademicSession.objects.filter(school=school, is_current=True).first()
-        current_term = Term.objects.filter(session=current_session, is_current=True).first()
+        current_session = request.tenant.session
+        current_term = request.tenant.term
         active_classes = ClassLevel.objects.filter(school=school).count()
         students = Student.objects.filter(school = school).count()
-        subjects = Subject.objects.filter(school__user = user).count()
+        subjects = Subject.objects.filter(school=school).count()
         # Example fallback values
         session_name = current_session.name if current_session else "Not Set"
         term_name = current_term.name if current_term else "Not Set"
@@ -114,7 +117,7 @@ class StartSessionView(APIView):
             return Response({"error": "session_name and school_id are required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            school = SchoolProfile.objects.filter(user=user).first()
+            school = request.tenant.school
         except SchoolProfile.DoesNotExist:
             return Response({"error": "School not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -127,6 +130,7 @@ class StartSessionView(APIView):
                 if is_current_session:
                     AcademicSession.objects.filter(school=school, is_current=True).update(is_current=False)
                     Term.objects.filter(session__school=school, is_current=True).update(is_current=False)
+                    forget_current_period(school.id)
 
                 # Create session
                 new_session = AcademicSession.objects.create(
@@ -218,6 +222,7 @@ class PaystackConfirmSubscriptionView(APIView):
                 if is_current_session:
                     AcademicSession.objects.filter(school=school, is_current=True).update(is_current=False)
                     Term.objects.filter(session__school=school, is_current=True).update(is_current=False)
+                    forget_current_period(school.id)
 
                 # Create session
                 new_session = AcademicSession.objects.create(
@@ -253,7 +258,7 @@ class AcademicSessionListAPIView(APIView):
         if not is_admin(user):
             raise PermissionDenied("You do not have permission to perform this action.")
         
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         if not school:
             return Response([])
 
@@ -268,18 +273,21 @@ class ToggleAcademicSessionAPIView(APIView):
     def post(self, request, pk):
         if not is_admin(request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
+        school = request.tenant.school
         try:
-            session = AcademicSession.objects.get(pk=pk)
+            session = AcademicSession.objects.get(pk=pk, school=school)
         except AcademicSession.DoesNotExist:
             return Response({'error': 'Academic session not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Deactivate all sessions and all their terms
-        AcademicSession.objects.all().update(is_current=False)
-        Term.objects.all().update(is_current=False)
+        with transaction.atomic():
+            # Deactivate the school's sessions and all their terms
+            AcademicSession.objects.filter(school=school).update(is_current=False)
+            Term.objects.filter(session__school=school).update(is_current=False)
+            forget_current_period(school.id)
 
-        # Activate selected session
-        session.is_current = True
-        session.save()
+            # Activate selected session
+            session.is_current = True
+            session.save()
 
         return Response({'message': 'Academic session activated successfully.'}, status=status.HTTP_200_OK)
 
@@ -290,8 +298,9 @@ class ToggleTermAPIView(APIView):
     def post(self, request, pk):
         if not is_admin(request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
+        school = request.tenant.school
         try:
-            term = Term.objects.select_related('session').get(pk=pk)
+            term = Term.objects.select_related('session').get(pk=pk, session__school=school)
         except Term.DoesNotExist:
             return Response({'error': 'Term not found.'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -299,12 +308,14 @@ class ToggleTermAPIView(APIView):
         if not term.session.is_current:
             return Response({'error': 'Cannot activate term. Its session is not active.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Deactivate all terms under the same session
-        Term.objects.filter(session=term.session).update(is_current=False)
+        with transaction.atomic():
+            # Deactivate all terms under the same session
+            Term.objects.filter(session=term.session).update(is_current=False)
+            forget_current_period(school.id)
 
-        # Activate this term
-        term.is_current = True
-        term.save()
+            # Activate this term
+            term.is_current = True
+            term.save()
 
         return Response({'message': 'Term activated successfully.'}, status=status.HTTP_200_OK)
     
@@ -336,8 +347,7 @@ class ClassLevelListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     @swagger_auto_schema(tags=["Admins"])
     def get(self, request):
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         class_levels = ClassLevel.objects.filter(school=school)
         serializer = ClassLevelSerializer(class_levels, many=True)
         return Response(serializer.data)
@@ -347,12 +357,63 @@ class ClassLevelStudentsAPIView(APIView):
     @swagger_auto_schema(tags=["Admins"])
     def get(self, request, class_level_id):
         class_level = get_object_or_404(ClassLevel, id=class_level_id)
-        school = SchoolProfile.objects.filter(user=request.user).first()
-        session = AcademicSession.objects.filter(school = school, is_current=True).first()
+        school = request.tenant.school
+        session = request.tenant.session
         students = StudentEnrollment.objects.filter(class_level=class_level, session = session, school = school)
         serializer = StudentEnrollmentSerializer(students, many=True)
         return Response(serializer.data)
 
+class ClassLevelOrderView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Admins"])
+    def put(self, request):
+        if not is_admin(self.request.user):
+            raise PermissionDenied("You do not have permission to perform this action.")
+
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        class_level_ids = request.data.get("class_levels")
+        if not isinstance(class_level_ids, list):
+            return Response({"error": "class_levels must be a list of class level ids, lowest class first."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            class_level_ids = [int(class_level_id) for class_level_id in class_level_ids]
+        except (TypeError, ValueError):
+            return Response({"error": "class_levels must be a list of class level ids, lowest class first."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not set_class_progression(school, class_level_ids):
+            return Response({"error": "class_levels must list every class of the school exactly once."}, status=status.HTTP_400_BAD_REQUEST)
+
+        class_levels = ClassLevel.objects.filter(school=school).order_by('order', 'id')
+        return Response(ClassLevelSerializer(class_levels, many=True).data, status=status.HTTP_200_OK)
+
+
+class PromotionPreviewView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Admins"])
+    def get(self, request):
+        if not is_admin(self.request.user):
+            raise PermissionDenied("You do not have permission to perform this action.")
+
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        session = None
+        session_id = request.query_params.get("session_id")
+        if session_id:
+            session = AcademicSession.objects.filter(school=school, id=session_id).first()
+            if not session:
+                return Response({"error": "Session not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        preview = preview_promotion(school, session)
+        if preview is None:
+            return Response({"error": "There is no earlier session to promote students from."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(preview, status=status.HTTP_200_OK)
+
+
 class StudentDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
     @swagger_auto_schema(tags=["Admins"])
@@ -387,8 +448,7 @@ class SubjectsListAPIView(APIView):
     def get(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         subjects = Subject.objects.filter(school=school)
         serializer = SubjectsSerializer(subjects, many=True)
         return Response(serializer.data)
@@ -397,8 +457,7 @@ class SubjectsListAPIView(APIView):
     def post(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         name = request.data.get("name", "").strip()
 
         # Check for duplicate name in the same school
@@ -442,8 +501,7 @@ class GradingListAPIView(APIView):
     def get(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         grade = GradingSystem.objects.filter(school=school)
         serializer = GradeSystemSerializer(grade, many=True)
         return Response(serializer.data)
@@ -452,8 +510,7 @@ class GradingListAPIView(APIView):
     def post(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
 
         # Extract fields from request.data
         min_score = request.data.get('min_score')
@@ -503,7 +560,7 @@ class DownloadAllStudentsAPIView(APIView):
     @swagger_auto_schema(tags=["Admins"])
     def get(self, request, *args, **kwargs):
         user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         if not school:
             return HttpResponse("School not found for the user.", status=400)
 
@@ -537,8 +594,7 @@ class SchoolProfileAPIView(APIView):
     def get(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         serializer = SchoolProfileSerializer(school)
         return Response(serializer.data)
     
@@ -546,8 +602,7 @@ class SchoolProfileAPIView(APIView):
     def put(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = SchoolProfile.objects.filter(user=request.user.pk).first()
         serializer = SchoolProfileSerializer(school, data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -564,7 +619,7 @@ class SchoolUsersListView(APIView):
         user = request.user
 
         # Get the school profile where this user is one of the admins
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         if not school:
             return Response({'error': 'School not found for this user.'}, status=404)
 
@@ -598,7 +653,7 @@ class CreateUserView(generics.CreateAPIView):
             phone = self.request.user.phone
         )
         
-        school = SchoolProfile.objects.filter(user=self.request.user).first()
+        school = self.request.tenant.school
         school.user.add(user)
     
         
@@ -613,6 +668,7 @@ class DeactivateUserView(APIView):
             user = User.objects.get(id=user_id)
             user.is_active = not user.is_active
             user.save()
+            bump_token_version(user)
             return Response({"message": True, "is_active": user.is_active}, status=201)
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=404)
@@ -629,8 +685,7 @@ class SubscriptionListView(generics.ListAPIView):
     def get_queryset(self):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = self.request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = self.request.tenant.school
         return Subscription.objects.filter(school=school).order_by('-expires_on')
     
 
@@ -644,10 +699,9 @@ class StudentsListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     @swagger_auto_schema(tags=["Admins"])
     def get(self, request):
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         
-        session = AcademicSession.objects.filter(school = school, is_current=True).first()
+        session = request.tenant.session
         students = StudentEnrollment.objects.filter(session = session, school = school)        
         paginator = StudentPagination()
         paginated_students = paginator.paginate_queryset(students, request)
@@ -661,8 +715,7 @@ class SchoolDetailsView(APIView):
     permission_classes = [IsAuthenticated]
     @swagger_auto_schema(tags=["Admins"])
     def get(self, request):
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = request.tenant.school
         print("school:", school)
         serializer = SchoolProfileSerializer(school)
         print("serialized data:", serializer.data)
@@ -676,14 +729,16 @@ class SchoolProfileUpdateView(APIView):
     def put(self, request):
         if not is_admin(self.request.user):
             raise PermissionDenied("You do not have permission to perform this action.")
-        user = request.user
-        school = SchoolProfile.objects.filter(user=user).first()
+        school = SchoolProfile.objects.filter(user=request.user.pk).first()
         if not school:
             return Response({"error": "School profile not found."}, status=status.HTTP_400_BAD_REQUEST)
 
+        ranking_policy = school.ranking_policy
         serializer = SchoolProfileSerializer(school, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            if school.ranking_policy != ranking_policy:
+                clear_school_rankings(school.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -700,15 +755,15 @@ class GetStudentCommentView(APIView):
         except Student.DoesNotExist:
             return Response({"error": "Invalid student"}, status=404)
         
-        school = SchoolProfile.objects.filter(user=request.user).first()
+        school = request.tenant.school
         if not school:
             return Response({"error": "School profile not found."}, status=404)
                 
-        session = AcademicSession.objects.filter(school = school, is_current=True).first()
+        session = request.tenant.session
         if not session:
             return Response({"error": "session not set"}, status=404)
         
-        term = Term.objects.filter(session=session, is_current=True).first()
+        term = request.tenant.term
         if not term:
             return Response({"error": "term not set"}, status=404)
         
@@ -718,4 +773,31 @@ class GetStudentCommentView(APIView):
             "principal_comment": resultSummary.principal_comment if resultSummary and resultSummary.principal_comment else "Not Set",
             "teacher_comment": resultSummary.teacher_comment if resultSummary and resultSummary.teacher_comment else "Not Set",
 
-        }, status=200)
\ No newline at end of file
+        }, status=200)
+    
+    
+    
+class JobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+    @swagger_auto_schema(tags=["Admins"])
+    def get(self, request, job_id):
+        if not is_admin(self.request.user):
+            raise PermissionDenied("You do not have permission to perform this action.")
+        
+        school = request.tenant.school
+        if not school:
+            return Response({"error": "School profile not found."}, status=404)
+        
+        job = Job.objects.filter(id=job_id, school=school).first()
+        if not job:
+            return Response({"error": "Job not found."}, status=404)
+        
+        return Response({
+            "id": job.id,
+            "name": job.name,
+            "status": job.status,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+        }, status=200)
@@ -0,0 +1,72 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+from .tokens import get_token_version
+from .user_cache import get_auth_state
+
+
+class ClaimsUser(TokenUser):
+    """
+    The user of an authenticated token. id, and for tokens issued with our
+    claims (see tokens.add_user_claims) school_id, is_admin and is_manager,
+    are read from the token; any other attribute loads the User row the
+    first time it is asked for in the request.
+    It isn't a model instance, so pass request.user.pk to queries.
+    """
+
+    @cached_property
+    def instance(self):
+        user = User.objects.filter(pk=self.id).first()
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        return user
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'token':
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.instance, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Trust the school and role claims of a token instead of loading the user.
+    A token is only checked against the user's cached auth state, which every
+    save of the user drops, so deactivating a user or changing their password
+    revokes it at once. Tokens issued before the claims existed are checked
+    against the same state the way JWTAuthentication checks the User.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token contained no recognizable user identification') from e
+
+        if 'token_version' not in validated_token:
+            return self.get_legacy_user(user_id, validated_token)
+
+        if validated_token['token_version'] != get_token_version(user_id):
+            raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+
+        return ClaimsUser(validated_token)
+
+    def get_legacy_user(self, user_id, validated_token):
+        # JWTAuthentication.get_user's checks, against the cached auth state
+        state = get_auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != state['password_hash']:
+                raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+        return ClaimsUser(validated_token)
@@ -25,6 +25,8 @@ class User(AbstractUser):
     is_admin = models.BooleanField(default=False)
     is_manager = models.BooleanField(default=False)
     have_access = models.BooleanField(default=True)
+    # Bumped to revoke every token issued so far (deactivation, password change)
+    token_version = models.PositiveIntegerField(default=0)
     profile_picture = models.ImageField(upload_to='profile_picture/', null=True, blank=True)
     
     def save(self, *args, **kwargs):
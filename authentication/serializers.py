@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ParseError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from .models import User
+from .tokens import add_user_claims
 
 
 
@@ -108,6 +110,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
         if obj.profile_picture and hasattr(obj.profile_picture, "url"):
             return request.build_absolute_uri(obj.profile_picture.url)
         return None
-        
-        
 
+
+
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
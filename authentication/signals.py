@@ -1,10 +1,12 @@
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from administrator.models import AcademicSession, SchoolProfile, Term
 
 from .models import User
+from .tokens import bump_token_version
+from .user_cache import forget_auth_state
 
 
 @receiver(post_save, sender=User)
@@ -27,4 +29,30 @@ def Create_User_Account_Balance(sender, instance, created, **kwargs):
                 Term.objects.create(
                     session=new_session,
                     name=term_name
-                )
\ No newline at end of file
+                )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_caches(sender, instance, **kwargs):
+    # is_active, the password and token_version are all part of the cached auth state
+    forget_auth_state(instance.pk)
+
+
+# Tokens carry these claims (tokens.add_user_claims), so changing one revokes them
+ROLE_FIELDS = ('is_admin', 'is_manager')
+
+
+@receiver(pre_save, sender=User)
+def remember_role_change(sender, instance, update_fields=None, **kwargs):
+    instance._role_changed = False
+    if instance.pk is None or (update_fields is not None and not set(ROLE_FIELDS) & set(update_fields)):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(*ROLE_FIELDS).first()
+    instance._role_changed = previous is not None and previous != tuple(getattr(instance, field) for field in ROLE_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_role_change(sender, instance, created, **kwargs):
+    if getattr(instance, '_role_changed', False):
+        bump_token_version(instance)
@@ -0,0 +1,50 @@
+from django.db.models import F
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from administrator.models import SchoolProfile
+
+from .models import User
+from .user_cache import forget_auth_state, get_auth_state
+
+
+# the version of missing and inactive users, so none of their tokens validate
+REVOKED = -1
+
+
+def add_user_claims(token, user):
+    """
+    Put the user's school and role in the token, so authenticated requests
+    don't have to load the user or their school. Access tokens made from a
+    refresh token copy these claims.
+    """
+    token['school_id'] = SchoolProfile.objects.filter(user=user).values_list('id', flat=True).first()
+    token['is_admin'] = user.is_admin
+    token['is_manager'] = user.is_manager
+    token['token_version'] = user.token_version
+    return token
+
+
+def tokens_for_user(user):
+    return add_user_claims(RefreshToken.for_user(user), user)
+
+
+def get_token_version(user_id):
+    """The user's current token version through the shared cache, REVOKED if they can't sign in."""
+    state = get_auth_state(user_id)
+    if state is None or not state['is_active']:
+        return REVOKED
+    return state['token_version']
+
+
+def bump_token_versions(*user_ids):
+    """Revoke every token issued so far to the users, e.g. when they leave a school or change role."""
+    if not user_ids:
+        return
+    User.objects.filter(id__in=user_ids).update(token_version=F('token_version') + 1)
+    forget_auth_state(*user_ids)
+
+
+def bump_token_version(user):
+    """Revoke every token issued to the user so far. Call it after saving the user."""
+    bump_token_versions(user.id)
+    user.token_version += 1
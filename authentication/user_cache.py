@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+
+# Dropped on every save and delete of the user, so it can be kept long
+AUTH_STATE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _auth_state_key(user_id):
+    return f'auth_state_{user_id}'
+
+
+def get_auth_state(user_id):
+    """
+    What authenticating a token checks about a user, through the shared
+    cache: is_active, token_version and the md5 of the password hash that
+    tokens carry. None if there is no such user. Only these fields are
+    cached, never the User row or the password hash itself.
+    """
+    state = cache.get(_auth_state_key(user_id))
+    if state is None:
+        user = User.objects.filter(pk=user_id).values('is_active', 'token_version', 'password').first()
+        if user is None:
+            return None
+        state = {
+            'is_active': user['is_active'],
+            'token_version': user['token_version'],
+            'password_hash': get_md5_hash_password(user['password']),
+        }
+        cache.set(_auth_state_key(user_id), state, AUTH_STATE_CACHE_TIMEOUT)
+    return state
+
+
+def forget_auth_state(*user_ids):
+    # Again on commit, in case a request cached the old state before the change committed
+    keys = [_auth_state_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
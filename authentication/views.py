@@ -27,6 +27,7 @@ from administrator.models import ClassLevel, SchoolProfile
 
 from .models import User, UserVerification
 from .serializers import *
+from .tokens import bump_token_version, tokens_for_user
 from .swagger import TaggedAutoSchema
 
 # Create your views here.
@@ -160,7 +161,7 @@ class UserVerificationView(generics.GenericAPIView):
                 user_verification.is_verified = True
                 user_verification.save()
                 
-                refresh = RefreshToken.for_user(user)
+                refresh = tokens_for_user(user)
                 access_token = str(refresh.access_token)
                 expiration_time = datetime.fromtimestamp(AccessToken(access_token)["exp"])
                 profile_pic_url = request.build_absolute_uri(user.profile_picture.url) if user.profile_picture else None
@@ -263,7 +264,7 @@ class LoginView(generics.GenericAPIView):
         if not user.is_active:
             return Response({"error": "Account is inactive"}, status=status.HTTP_400_BAD_REQUEST)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         access_token = str(refresh.access_token)
         expiration_time = datetime.fromtimestamp(AccessToken(access_token)["exp"])
         profile_pic_url = request.build_absolute_uri(user.profile_picture.url) if user.profile_picture else None
@@ -355,11 +356,12 @@ class ForgetPasswordVerificationView(generics.GenericAPIView):
                 user = user_verification.user
                 user.password = make_password(password)
                 user.save()
+                bump_token_version(user)
             
                 user_verification.is_verified = True
                 user_verification.save()
                 
-                refresh = RefreshToken.for_user(user)
+                refresh = tokens_for_user(user)
                 access_token = str(refresh.access_token)
                 expiration_time = datetime.fromtimestamp(AccessToken(access_token)["exp"])
                 profile_pic_url = request.build_absolute_uri(user.profile_picture.url) if user.profile_picture else None
@@ -401,14 +403,20 @@ class ChangePasswordView(generics.GenericAPIView):
             if password1 != password2:
                 return Response({'error': 'New password and confirm password do not match.'}, status=status.HTTP_400_BAD_REQUEST)
             
-            user = request.user
+            user = User.objects.get(pk=request.user.pk)
             if not user.check_password(password):
                 return Response({"error": "Old Password is incorrect"}, status=status.HTTP_400_BAD_REQUEST)
 
             user.password = make_password(password1)
             user.save()
-                
-            
-            return Response({'message': 'Password Changed'}, status=status.HTTP_200_OK)
+            # Signs out every other device; this one carries on with the new tokens
+            bump_token_version(user)
+
+            refresh = tokens_for_user(user)
+            return Response({
+                'message': 'Password Changed',
+                'refresh': str(refresh),
+                'access': str(refresh.access_token),
+            }, status=status.HTTP_200_OK)
     
         return Response({"error":serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -3,6 +3,7 @@ import os
 from datetime import timedelta
 from django.utils import timezone
 from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 
 from pathlib import Path
@@ -57,6 +58,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "administrator.tenancy.TenantMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -93,6 +95,39 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared by every web and job worker process: grading versions, report cards,
+# upload job status and the auth, tenant and parent lookups all rely on it,
+# and on it answering without a database query. Production needs Redis
+# (REDIS_URL) or memcached (MEMCACHED_LOCATION); with DEBUG on, a
+# single-process development server may use the local memory cache.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('REDIS_URL'),
+        }
+    }
+elif os.getenv('MEMCACHED_LOCATION'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": os.getenv('MEMCACHED_LOCATION'),
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        "Set REDIS_URL or MEMCACHED_LOCATION: every worker process must share one cache."
+    )
+
 AUTH_PASSWORD_VALIDATORS = [
 
 ]
@@ -193,7 +228,7 @@ SIMPLE_JWT = {
 REST_FRAMEWORK = {
     "NON_FIELD_ERRORS_KEY": "errors",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
@@ -302,6 +337,30 @@ PAYSTACK_SECRET_KEY=os.getenv('PAYSTACK_SECRET_KEY')
 
 SUBSCRIPTION_PRICE = 20000
 
+# Server-side result printouts (PDF)
+PRINTOUT_WORKERS = int(os.getenv('PRINTOUT_WORKERS', os.cpu_count() or 1))
+# Outside MEDIA_ROOT, which is served publicly: printouts are only sent by the authorized views
+PRINTOUT_CACHE_DIR = os.getenv('PRINTOUT_CACHE_DIR', os.path.join(BASE_DIR, "private", "printouts"))
+PRINTOUT_CACHE_MAX_AGE = int(os.getenv('PRINTOUT_CACHE_MAX_AGE', 60 * 60 * 24))
+PRINTOUT_CACHE_MAX_BYTES = int(os.getenv('PRINTOUT_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+
+# Spreadsheet uploads
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 5 * 1024 * 1024))
+UPLOAD_MAX_ROWS = int(os.getenv('UPLOAD_MAX_ROWS', 5000))
+UPLOAD_MAX_COLUMNS = int(os.getenv('UPLOAD_MAX_COLUMNS', 20))
+UPLOAD_PARSE_WORKERS = int(os.getenv('UPLOAD_PARSE_WORKERS', 2))
+UPLOAD_PARSE_QUEUE = int(os.getenv('UPLOAD_PARSE_QUEUE', 8))
+
+# Background jobs (python manage.py runworker)
+JOBS_RUN_EAGERLY = os.getenv('JOBS_RUN_EAGERLY') == 'True'
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 3))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 30))
+JOBS_VISIBILITY_TIMEOUT = int(os.getenv('JOBS_VISIBILITY_TIMEOUT', 300))
+
+# Parent portal: signed session tokens instead of stored access codes
+PARENT_SIGNED_TOKENS = os.getenv('PARENT_SIGNED_TOKENS') == 'True'
+PARENT_TOKEN_LIFETIME = timedelta(days=int(os.getenv('PARENT_TOKEN_LIFETIME_DAYS', 5)))
+
 CORS_ALLOW_HEADERS = list(default_headers) + [
     'X-parent-code',
 ]
\ No newline at end of file